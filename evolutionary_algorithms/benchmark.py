@@ -0,0 +1,237 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import platform
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import evolutionary_algorithms.bit_string_optimization as bit_string_optimization
+from evolutionary_algorithms.genetic_algorithm import GeneticAlgorithm
+from evolutionary_algorithms.vectorized_genetic_algorithm import VectorizedGeneticAlgorithm
+from utils import peak_memory_mb
+
+# benchmark parameters
+POPULATION_SIZES = [50, 200]
+STRING_LENGTHS = [100, 1000, 10000]
+REPLACEMENT_SHARES = [0.3, 0.5]  # r
+MUTATION_SHARES = [0.1, 0.3]  # m
+SEED = 42
+TIME_BUDGET = 10  # seconds per run
+MAX_GENERATIONS = 100000
+# only for the steady state engine
+TOURNAMENT_SIZE = 2
+# regressions above this share are reported by compare
+REGRESSION_TOLERANCE = 0.1
+OUTPUT = 'genetic_algorithm_benchmark.json'
+
+
+# reference implementation with bit strings as str (the original genome representation)
+def string_fitness(bit_string, optimum):
+    distance = 0
+    for i in range(len(bit_string)):
+        if bit_string[i] != optimum[i]:
+            distance += 1
+    return len(optimum) - distance
+
+
+def string_cross_over(parents):
+    cross_over_point = random.randint(1, len(parents[0]) - 1)
+    child_one = parents[0][:cross_over_point] + parents[1][cross_over_point:]
+    child_two = parents[1][:cross_over_point] + parents[0][cross_over_point:]
+    return [child_one, child_two]
+
+
+def string_mutate(hypothesis):
+    index = random.randint(0, len(hypothesis) - 1)
+    return hypothesis[:index] + ('0' if hypothesis[index] == '1' else '1') + hypothesis[index + 1:]
+
+
+def run_string(population_size, string_length, r, m, seed, stop_event):
+    population = [''.join(random.choice('01') for i in range(string_length)) for individual in range(population_size)]
+    genetic_algorithm = GeneticAlgorithm(population, string_fitness, string_cross_over, string_mutate, string_length,
+                                         r, m, '1' * string_length)
+    return run_generic(genetic_algorithm, stop_event)
+
+
+def run_packed(population_size, string_length, r, m, seed, stop_event):
+    genetic_algorithm = GeneticAlgorithm(packed_population(population_size), bit_string_optimization.fitness,
+                                         bit_string_optimization.cross_over, bit_string_optimization.mutate,
+                                         string_length, r, m, bit_string_optimization.FULL_MASK)
+    return run_generic(genetic_algorithm, stop_event)
+
+
+def run_steady_state(population_size, string_length, r, m, seed, stop_event):
+    genetic_algorithm = GeneticAlgorithm(packed_population(population_size), bit_string_optimization.fitness,
+                                         bit_string_optimization.cross_over, bit_string_optimization.mutate,
+                                         string_length, r, m, bit_string_optimization.FULL_MASK)
+    evaluations = genetic_algorithm.fitness_cache.misses
+    max_steps = MAX_GENERATIONS * population_size // 2
+    genetic_algorithm.run_steady_state(TOURNAMENT_SIZE, 2, max_steps, stop_event)
+    return genetic_algorithm.statistics, genetic_algorithm.generation_counter - 1, \
+        genetic_algorithm.fitness_cache.misses - evaluations
+
+
+def run_vectorized(population_size, string_length, r, m, seed, stop_event):
+    population = np.random.randint(0, 2, (population_size, string_length), dtype=np.uint8)
+    genetic_algorithm = VectorizedGeneticAlgorithm(population, bit_string_optimization.vectorized_fitness,
+                                                   string_length, r, m, np.ones(string_length, dtype=np.uint8),
+                                                   seed=seed)
+    genetic_algorithm.run(MAX_GENERATIONS, stop_event)
+    generations = genetic_algorithm.generation_counter - 1
+    return genetic_algorithm.statistics, generations, generations * population_size
+
+
+def packed_population(population_size):
+    return [bit_string_optimization.generate_random_bit_string('random') for individual in range(population_size)]
+
+
+def run_generic(genetic_algorithm, stop_event):
+    """
+    runs a GeneticAlgorithm
+    :return: statistics, number of generations and number of fitness evaluations of the run
+    """
+    evaluations = genetic_algorithm.fitness_cache.misses
+    genetic_algorithm.run(MAX_GENERATIONS, stop_event)
+    return genetic_algorithm.statistics, genetic_algorithm.generation_counter - 1, \
+        genetic_algorithm.fitness_cache.misses - evaluations
+
+
+# engine name -> run function (population_size, string_length, r, m, seed, stop_event), random and np.random are
+# already seeded by run_case, engines with an own generator seed it with seed
+ENGINES = {
+    'string': run_string,
+    'packed': run_packed,
+    'steady_state': run_steady_state,
+    'vectorized': run_vectorized
+}
+
+
+def run_case(engine, population_size, string_length, r, m, seed, time_budget):
+    """
+    runs one engine with one parameter setting, meant to be executed in a fresh process to measure its peak memory
+    :return: result dictionary
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    bit_string_optimization.set_string_length(string_length)
+    stop_event = threading.Event()
+    timer = threading.Timer(time_budget, stop_event.set)
+    timer.start()
+    try:
+        statistics, generations, evaluations = ENGINES[engine](population_size, string_length, r, m, seed,
+                                                               stop_event)
+    finally:
+        timer.cancel()
+
+    seconds = statistics.elapsed_seconds()
+    times_to_threshold = [history_seconds for iteration, history_seconds, history_fitness
+                          in statistics.best_fitness_history if history_fitness >= string_length]
+    return {
+        'engine': engine,
+        'population_size': population_size,
+        'string_length': string_length,
+        'r': r,
+        'm': m,
+        'seed': seed,
+        'time_budget': time_budget,
+        'seconds': seconds,
+        'generations': generations,
+        'generations_per_second': generations / seconds if seconds > 0 else 0.0,
+        'evaluations': evaluations,
+        'evaluations_per_second': evaluations / seconds if seconds > 0 else 0.0,
+        'best_fitness': statistics.best_fitness,
+        'seconds_to_threshold': times_to_threshold[0] if times_to_threshold else None,
+        'peak_memory_mb': peak_memory_mb()
+    }
+
+
+def print_result(result):
+    print('{engine} P={population_size} L={string_length} r={r} m={m}: {generations_per_second:.1f} generations/s, '
+          '{evaluations_per_second:.0f} evaluations/s, best fitness {best_fitness}'.format(**result), end='')
+    if result['seconds_to_threshold'] is not None:
+        print(', threshold after {:.3f}s'.format(result['seconds_to_threshold']), end='')
+    if result['peak_memory_mb'] is not None:
+        print(', peak memory {:.1f} MB'.format(result['peak_memory_mb']), end='')
+    print()
+
+
+def run_benchmark(engines, population_sizes, string_lengths, replacement_shares, mutation_shares, seed,
+                  time_budget):
+    """
+    runs every engine with every parameter setting, each case in its own process
+    :return: benchmark results with metadata
+    """
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for population_size, string_length, r, m in itertools.product(population_sizes, string_lengths,
+                                                                  replacement_shares, mutation_shares):
+        for engine in engines:
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                result = executor.submit(run_case, engine, population_size, string_length, r, m, seed,
+                                         time_budget).result()
+            print_result(result)
+            results.append(result)
+
+    return {
+        'metadata': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'seed': seed,
+            'time_budget': time_budget
+        },
+        'results': results
+    }
+
+
+def compare(old_results, new_results):
+    """
+    prints the changes of the throughput between two benchmark results
+    :param old_results: results of the older version
+    :param new_results: results of the newer version
+    :return: list of (case, old generations/s, new generations/s) of regressions
+    """
+    def key(result):
+        return result['engine'], result['population_size'], result['string_length'], result['r'], result['m']
+
+    old_cases = {key(result): result for result in old_results['results']}
+    regressions = []
+    for result in new_results['results']:
+        old = old_cases.get(key(result))
+        if old is None or old['generations_per_second'] == 0:
+            continue
+        throughput = result['generations_per_second'] / old['generations_per_second']
+        print('{} P={} L={} r={} m={}: generations/s x{:.2f}'.format(*key(result), throughput))
+        if throughput < 1 - REGRESSION_TOLERANCE:
+            regressions.append((key(result), old['generations_per_second'], result['generations_per_second']))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='benchmark of the genetic algorithm engines on bit strings')
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument('--population-sizes', type=int, nargs='+', default=POPULATION_SIZES)
+    parser.add_argument('--string-lengths', type=int, nargs='+', default=STRING_LENGTHS)
+    parser.add_argument('--r', type=float, nargs='+', default=REPLACEMENT_SHARES)
+    parser.add_argument('--m', type=float, nargs='+', default=MUTATION_SHARES)
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--time-budget', type=float, default=TIME_BUDGET)
+    parser.add_argument('--output', default=OUTPUT)
+    parser.add_argument('--compare', help='results of an older version to compare with')
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmark(args.engines, args.population_sizes, args.string_lengths, args.r, args.m,
+                                      args.seed, args.time_budget)
+    with open(args.output, 'w') as file:
+        json.dump(benchmark_results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            for regression in compare(json.load(file), benchmark_results):
+                print('Regression:', regression)
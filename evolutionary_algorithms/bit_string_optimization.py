@@ -1,5 +1,10 @@
 import random
+
+import numpy as np
+
 from evolutionary_algorithms.genetic_algorithm import GeneticAlgorithm
+from evolutionary_algorithms.vectorized_genetic_algorithm import VectorizedGeneticAlgorithm
+from telemetry import PrintObserver
 
 # Parameters
 P = 100  # Population size
@@ -8,20 +13,45 @@ M = 0.1  # share to mutate with one bit
 FITNESS_THRESHOLD = 100
 STRING_LENGTH = 100
 STRING_CONTENT = '1'  # random, 0 or 1
+CROSS_OVER = 'one_point'  # one_point or uniform
+ENGINE = 'generic'  # generic (bit strings packed into ints) or vectorized (population as numpy array)
+SELECTION = 'fitness_proportional'  # fitness_proportional or rank, only vectorized engine
+HEADLESS = False  # True saves the fitness plot to fitness_history.png instead of showing it
+
+# bit strings are packed into python ints, bit i of the int is position i of the string
+FULL_MASK = (1 << STRING_LENGTH) - 1
+
+
+def set_string_length(length):
+    """
+    changes the length of the bit strings of all functions of this module
+    :param length: number of bits
+    """
+    global STRING_LENGTH, FULL_MASK
+    STRING_LENGTH = length
+    FULL_MASK = (1 << length) - 1
+
+
+def count_bits(value):
+    """
+    returns the number of set bits (popcount) of a non negative int
+    """
+    return bin(value).count('1')
+
+
+if hasattr(int, 'bit_count'):  # python >= 3.10
+    count_bits = int.bit_count
 
 
 def fitness(bit_string, optimum):
     """
-    returns the hamming distance between the given string and the optimum_string as the fitness
+    returns the string length minus the hamming distance between the given string and the optimum_string as the
+    fitness
     :param bit_string: bit string
     :param optimum: optimal bit string to compare with
     :return: fitness
     """
-    distance = 0
-    for i in range(STRING_LENGTH - 1):
-        if bit_string[i] != optimum[i]:
-            distance += 1
-    return len(optimum) - distance
+    return STRING_LENGTH - count_bits(bit_string ^ optimum)
 
 
 def cross_over(parents):
@@ -30,9 +60,24 @@ def cross_over(parents):
     :param parents: parent tupel
     :return: child list
     """
-    cross_over_point = random.randint(1, len(parents[0]) - 1)
-    child_one = parents[0][:cross_over_point] + parents[1][cross_over_point:]
-    child_two = parents[1][:cross_over_point] + parents[0][cross_over_point:]
+    cross_over_point = random.randint(1, STRING_LENGTH - 1)
+    head_mask = (1 << cross_over_point) - 1
+    tail_mask = FULL_MASK ^ head_mask
+    child_one = (parents[0] & head_mask) | (parents[1] & tail_mask)
+    child_two = (parents[1] & head_mask) | (parents[0] & tail_mask)
+    return [child_one, child_two]
+
+
+def uniform_cross_over(parents):
+    """
+    creates two children with cross over from parents, each bit is taken from a random parent
+    :param parents: parent tupel
+    :return: child list
+    """
+    mask = random.getrandbits(STRING_LENGTH)
+    inverse_mask = FULL_MASK ^ mask
+    child_one = (parents[0] & mask) | (parents[1] & inverse_mask)
+    child_two = (parents[1] & mask) | (parents[0] & inverse_mask)
     return [child_one, child_two]
 
 
@@ -40,8 +85,7 @@ def mutate(hypothesis):
     """
     mutates one random index to the complementary bit
     """
-    index = random.randint(0, len(hypothesis) - 1)
-    return hypothesis[:index] + ('0' if hypothesis[index] == '1' else '1') + hypothesis[index + 1:]
+    return hypothesis ^ (1 << random.randint(0, STRING_LENGTH - 1))
 
 
 def generate_random_bit_string(string_content):
@@ -50,17 +94,44 @@ def generate_random_bit_string(string_content):
     :param string_content: bit
     :return: generated string
     """
-    string = ''
-    for i in range(STRING_LENGTH):
-        if string_content is 'random':
-            string += str(1) if random.random() < 0.5 else str(0)
-        else:
-            string += str(string_content)
+    if string_content == 'random':
+        return random.getrandbits(STRING_LENGTH)
+    return FULL_MASK if str(string_content) == '1' else 0
+
 
-    return string
+def vectorized_fitness(population, optimum):
+    """
+    returns the fitness of all bit strings of a (P, L) array like fitness
+    :param population: (P, L) array of bits
+    :param optimum: (L,) array of the optimal bit string
+    :return: (P,) array of fitness values
+    """
+    return STRING_LENGTH - np.count_nonzero(population != optimum, axis=1)
+
+
+def to_string(bit_string):
+    """
+    :return: bit string as str of 0 and 1, position 0 first
+    """
+    return format(bit_string, '0{}b'.format(STRING_LENGTH))[::-1]
 
 
 if __name__ == '__main__':
-    population = [generate_random_bit_string('random') for individual in range(P)]
-    optimum = generate_random_bit_string('1')
-    GeneticAlgorithm(population, fitness, cross_over, mutate, FITNESS_THRESHOLD, R, M, optimum).run()
+    if ENGINE == 'vectorized':
+        optimum = np.ones(STRING_LENGTH, dtype=np.uint8)
+        population = np.random.randint(0, 2, (P, STRING_LENGTH), dtype=np.uint8)
+        print('Optimum:', ''.join(map(str, optimum)))
+        genetic_algorithm = VectorizedGeneticAlgorithm(population, vectorized_fitness, FITNESS_THRESHOLD, R, M, optimum,
+                                                       SELECTION, CROSS_OVER, observers=[PrintObserver()])
+        genetic_algorithm.run()
+        genetic_algorithm.print_finish()
+    else:
+        population = [generate_random_bit_string('random') for individual in range(P)]
+        optimum = generate_random_bit_string('1')
+        print('Optimum:', to_string(optimum))
+        genetic_algorithm = GeneticAlgorithm(population, fitness, cross_over if CROSS_OVER == 'one_point'
+                                             else uniform_cross_over, mutate, FITNESS_THRESHOLD, R, M, optimum,
+                                             observers=[PrintObserver()])
+        genetic_algorithm.run()
+        genetic_algorithm.print_finish(headless=HEADLESS)
+        print('Best bit string:', to_string(genetic_algorithm.best_hypothesis))
@@ -0,0 +1,92 @@
+from collections import OrderedDict
+
+from evolutionary_algorithms.parallel_evaluation import evaluate_fitness
+
+
+class FitnessCache:
+    """
+    memoizes a fitness function keyed by the genome (hypotheses must be hashable), the cache is bounded and evicts the
+    least recently used genomes
+    """
+
+    def __init__(self, fitness, optimum=None, cache_size=1024):
+        """
+        creates a fitness cache
+        :param fitness: fitness function (hypothesis, optimum) -> fitness
+        :param optimum: optimum passed to the fitness function
+        :param cache_size: maximal number of cached genomes, 0 disables the cache
+        """
+        self.fitness = fitness
+        self.optimum = optimum
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, hypothesis):
+        """
+        returns the fitness of the hypothesis, served from the cache when possible
+        :param hypothesis: hypothesis
+        :return: fitness
+        """
+        cached = self.cache.get(hypothesis)
+        if cached is not None:
+            self.hits += 1
+            self.cache.move_to_end(hypothesis)
+            return cached
+
+        self.misses += 1
+        fitness = self.fitness(hypothesis, self.optimum)
+        self.store(hypothesis, fitness)
+        return fitness
+
+    def evaluate_all(self, hypotheses, executor=None, chunk_size=None):
+        """
+        returns the fitness of all hypotheses, each genome missing in the cache is evaluated once, all of them together
+        in chunks by the executor
+        :param hypotheses: list of hypotheses
+        :param executor: optional executor (see parallel_evaluation.evaluate_fitness)
+        :param chunk_size: optional hypotheses per submitted task
+        :return: list of fitness values in the order of hypotheses
+        """
+        fitness_values = {}
+        missing = []
+        for hypothesis in dict.fromkeys(hypotheses):
+            cached = self.cache.get(hypothesis)
+            if cached is None:
+                missing.append(hypothesis)
+            else:
+                fitness_values[hypothesis] = cached
+                self.cache.move_to_end(hypothesis)
+
+        for hypothesis, fitness in zip(missing, evaluate_fitness(self.fitness, missing, self.optimum, executor,
+                                                                 chunk_size)):
+            fitness_values[hypothesis] = fitness
+            self.store(hypothesis, fitness)
+        self.misses += len(missing)
+        self.hits += len(hypotheses) - len(missing)
+        return [fitness_values[hypothesis] for hypothesis in hypotheses]
+
+    def store(self, hypothesis, fitness):
+        """
+        adds a fitness value to the cache and evicts the least recently used genome if the cache is full
+        """
+        if self.cache_size > 0:
+            self.cache[hypothesis] = fitness
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def hit_rate(self):
+        """
+        :return: share of fitness requests served from the cache
+        """
+        requests = self.hits + self.misses
+        return self.hits / requests if requests > 0 else 0.0
+
+    def clear(self):
+        """
+        empties the cache and resets its counters
+        """
+        self.cache.clear()
+        self.hits = 0
+        self.misses = 0
@@ -1,5 +1,12 @@
+import math
 import random
-import matplotlib.pyplot as plt
+
+import numpy as np
+
+from evolutionary_algorithms.fitness_cache import FitnessCache
+from evolutionary_algorithms.indexed_population import IndexedPopulation
+from telemetry import Telemetry
+from utils import DiscreteSampler, get_pyplot
 
 
 class GeneticAlgorithm:
@@ -7,7 +14,8 @@ class GeneticAlgorithm:
     a generic genetic algorithm to optimize a population
     """
 
-    def __init__(self, population, fitness, cross_over, mutate, fitness_threshold, r, m, optimum=None):
+    def __init__(self, population, fitness, cross_over, mutate, fitness_threshold, r, m, optimum=None, observers=None,
+                 sample_interval=1, fitness_cache_size=None, executor=None, chunk_size=None, rng=None):
         """
         generates a new genetic algorithm
         :param population: population to optimize
@@ -18,6 +26,15 @@ class GeneticAlgorithm:
         :param r: share to replace with cross over
         :param m: share to mutate
         :param optimum: optimum hypothesis
+        :param observers: list of telemetry observers (f.e. PrintObserver), silent by default
+        :param sample_interval: generations between two progress notifications of the observers
+        :param fitness_cache_size: number of genomes whose fitness is memoized across generations, defaults to four
+                                   population sizes, 0 disables the cache
+        :param executor: optional executor (f.e. ThreadPoolExecutor, ProcessPoolExecutor or SerialExecutor) which
+                         evaluates the new individuals of each generation in chunks, the caller shuts it down
+        :param chunk_size: individuals per task of the executor, defaults to an even split over the cpus
+        :param rng: numpy random generator of the batch selection, by default each run seeds a new one from the random
+                    module, so random.seed alone reproduces a run
         """
         self.population = population
         # Functions
@@ -30,24 +47,43 @@ class GeneticAlgorithm:
         self.m = m
         self.p = len(self.population)
         self.optimum = optimum
-        print('Optimum:', self.optimum)
+        self.fitness_cache = FitnessCache(fitness, optimum, 4 * self.p if fitness_cache_size is None
+                                          else fitness_cache_size)
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.rng = rng
+        self.telemetry = Telemetry(observers, sample_interval)
+        self.statistics = None
         # create first generation
         self.generation_counter = 1
         self.fitness_dict = None
+        self.sampler = None
         self.update_fitness_dict()
         self.best_hypothesis = None
         self.best_fitness_generation_list = []
         self.update_best_hypothesis()
 
-    def run(self):
-        self.print_generation()
+    def run(self, max_generations=None, stop_event=None):
+        """
+        runs generations until the fitness threshold or the optimum is reached
+        :param max_generations: optional generation counter at which the run pauses, run can be called again
+        :param stop_event: optional threading or multiprocessing Event, the run stops after the generation in which it
+                           is set
+        :return: best hypothesis
+        """
+        telemetry = self.telemetry
+        best_fitness = self.fitness_dict[self.best_hypothesis]
+        telemetry.start(self, 'Genetic Algorithm', best_fitness)
+        next_sample = self.generation_counter + telemetry.sample_interval
+        rng = self.rng if self.rng is not None else np.random.default_rng(random.getrandbits(64))
 
-        while self.fitness_dict[self.best_hypothesis] < self.fitness_threshold and self.optimum not in self.population:
+        while not self.is_finished() and (max_generations is None or self.generation_counter < max_generations) \
+                and (stop_event is None or not stop_event.is_set()):
             new_generation = [self.best_hypothesis]
 
             # Selection
-            while len(new_generation) < self.p * self.r:
-                new_generation.append(self.select_random_hypothesis(self.population))
+            selections = max(0, math.ceil(self.p * self.r) - len(new_generation))
+            new_generation += [self.population[index] for index in self.sampler.sample_batch(selections, rng)]
 
             # Crossover
             parent_counter = 0
@@ -68,9 +104,97 @@ class GeneticAlgorithm:
             self.generation_counter += 1
             self.update_fitness_dict()
             self.update_best_hypothesis()
-            self.print_generation()
 
-        self.print_finish()
+            generation_best_fitness = self.fitness_dict[self.best_hypothesis]
+            if generation_best_fitness > best_fitness:
+                best_fitness = generation_best_fitness
+                telemetry.improvement(self.generation_counter, best_fitness)
+            if self.generation_counter == next_sample:
+                telemetry.sample(self.generation_counter, 0, 0, generation_best_fitness)
+                next_sample += telemetry.sample_interval
+
+        self.statistics = telemetry.finish(self.generation_counter, 0, 0, self.fitness_dict[self.best_hypothesis])
+        return self.best_hypothesis
+
+    def run_steady_state(self, tournament_size=2, replacements=2, max_steps=None, stop_event=None):
+        """
+        runs the steady state mode: in each step parents are chosen by k-tournaments, crossed over with probability r
+        (otherwise copied), each child is mutated with probability m and replaces the currently worst individual, so
+        the cost of a step does not grow with the population size
+        self.population, self.fitness_dict and self.best_hypothesis are updated at the end of the run, the generation
+        counter and the fitness history advance whenever as many individuals as the population size were replaced
+        :param tournament_size: number of random individuals of which the best is selected as parent
+        :param replacements: children created and worst individuals replaced in each step (rounded up to pairs)
+        :param max_steps: optional maximal number of steps
+        :param stop_event: optional threading or multiprocessing Event, the run stops after the step in which it is
+                           set
+        :return: best hypothesis
+        """
+        indexed_population = IndexedPopulation(self.population, [self.fitness_dict[h] for h in self.population])
+        telemetry = self.telemetry
+        best_fitness = indexed_population.fitness_values[indexed_population.best_slot()]
+        telemetry.start(self, 'Genetic Algorithm (steady state)', best_fitness)
+        next_sample = telemetry.sample_interval
+        step = 0
+        # children are created in pairs
+        replacements += replacements % 2
+        # a generation corresponds to replacing as many individuals as the population size
+        replaced = 0
+
+        while best_fitness < self.fitness_threshold and self.optimum not in indexed_population \
+                and (max_steps is None or step < max_steps) and (stop_event is None or not stop_event.is_set()):
+            step += 1
+            children = []
+            while len(children) < replacements:
+                father = self.select_by_tournament(indexed_population, tournament_size)
+                mother = self.select_by_tournament(indexed_population, tournament_size)
+                children += self.cross_over((father, mother)) if random.random() < self.r else [father, mother]
+
+            for child in children:
+                if random.random() < self.m:
+                    child = self.mutate(child)
+                fitness = self.fitness_cache(child)
+                indexed_population.replace(indexed_population.worst_slot(), child, fitness)
+                if fitness > best_fitness:
+                    best_fitness = fitness
+                    telemetry.improvement(step, best_fitness)
+            replaced += len(children)
+            if replaced >= self.p:
+                replaced -= self.p
+                self.generation_counter += 1
+                self.best_fitness_generation_list.append(best_fitness)
+
+            if step == next_sample:
+                telemetry.sample(step, 0, 0, best_fitness)
+                next_sample += telemetry.sample_interval
+
+        self.population = indexed_population.population
+        self.fitness_dict = dict(zip(self.population, indexed_population.fitness_values))
+        self.best_hypothesis = self.population[indexed_population.best_slot()]
+        self.sampler = DiscreteSampler(indexed_population.fitness_values)
+        self.statistics = telemetry.finish(step, 0, 0, best_fitness)
+        return self.best_hypothesis
+
+    def select_by_tournament(self, indexed_population, tournament_size):
+        """
+        selects the best of tournament_size random individuals
+        :param indexed_population: IndexedPopulation
+        :param tournament_size: number of competing individuals
+        :return: selected hypothesis
+        """
+        fitness_values = indexed_population.fitness_values
+        winner = random.randrange(len(indexed_population))
+        for i in range(tournament_size - 1):
+            competitor = random.randrange(len(indexed_population))
+            if fitness_values[competitor] > fitness_values[winner]:
+                winner = competitor
+        return indexed_population.population[winner]
+
+    def is_finished(self):
+        """
+        :return: True if the fitness threshold is reached or the optimum is part of the population
+        """
+        return self.fitness_dict[self.best_hypothesis] >= self.fitness_threshold or self.optimum in self.population
 
     def select_random_hypothesis(self, population):
         """
@@ -78,25 +202,19 @@ class GeneticAlgorithm:
         :param population: population to select from
         :return: random hypothesis
         """
-        selection_probability = random.random()
-        probability_sum = 0
-        index = random.randint(0, len(population) - 1)
-        population_fitness_sum = sum([self.fitness(h, self.optimum) for h in population])
-
-        while True:  # do while loop
-            index += 1
-            index = index % self.p
-            probability_sum += (self.fitness(population[index], self.optimum) / population_fitness_sum)
-            if selection_probability < probability_sum:  # do while loop
-                break
-
-        return population[index]
+        if population is self.population:
+            return population[self.sampler.sample()]
+        return population[DiscreteSampler([self.fitness_cache(h) for h in population]).sample()]
 
     def update_fitness_dict(self):
         """
         updates self.fitness_dict with individuals / hypotheses of self.population as key and their fitness as value
+        and the roulette wheel sampler of the population, only genomes missing in the fitness cache are evaluated
+        (with the executor if given)
         """
-        self.fitness_dict = {h: self.fitness(h, self.optimum) for h in self.population}
+        fitness_values = self.fitness_cache.evaluate_all(self.population, self.executor, self.chunk_size)
+        self.fitness_dict = dict(zip(self.population, fitness_values))
+        self.sampler = DiscreteSampler([self.fitness_dict[h] for h in self.population])
 
     def update_best_hypothesis(self):
         """
@@ -111,16 +229,44 @@ class GeneticAlgorithm:
         """
         print(str('-' * 10 + ' {}. generation ' + '-' * 10).format(self.generation_counter))
         print('Population size: {}'.format(self.p))
-        print('Best hypothesis: {}, fitness: {}'.format(self.best_hypothesis, self.fitness(self.best_hypothesis,
-                                                                                           self.optimum)))
+        print('Best hypothesis: {}, fitness: {}'.format(self.best_hypothesis, self.fitness_cache(self.best_hypothesis)))
 
-    def print_finish(self):
+    def print_finish(self, plot=True, headless=False, plot_path=None):
         """
-        prints information after finish
+        prints information after finish and plots the best fitness of each generation
+        :param plot: plot the fitness history
+        :param headless: save the plot without showing it (non interactive backend)
+        :param plot_path: optional file to save the plot to, defaults to fitness_history.png in headless mode
         """
         print('-' * 150)
         print('Target reachted after {} generations'.format(self.generation_counter))
-        print('Best hypothesis: {}, fitness: {}'.format(self.best_hypothesis, self.fitness(self.best_hypothesis,
-                                                                                           self.optimum)))
+        print('Fitness evaluations: {} (cache hit rate {:.3f})'.format(self.fitness_cache.misses,
+                                                                      self.fitness_cache.hit_rate()))
+        print('Best hypothesis: {}, fitness: {}'.format(self.best_hypothesis, self.fitness_cache(self.best_hypothesis)))
+        if plot:
+            self.plot_fitness_history(headless, plot_path)
+
+    def get_fitness_history(self):
+        """
+        :return: array of the best fitness of each generation (of each population size replacements in steady state
+                 mode)
+        """
+        return np.array(self.best_fitness_generation_list)
+
+    def plot_fitness_history(self, headless=False, plot_path=None):
+        """
+        plots the best fitness of each generation, matplotlib is only imported here
+        :param headless: save the plot without showing it (non interactive backend)
+        :param plot_path: optional file to save the plot to, defaults to fitness_history.png in headless mode
+        """
+        plt = get_pyplot(headless)
+        figure = plt.figure()
         plt.plot(range(len(self.best_fitness_generation_list)), self.best_fitness_generation_list)
-        plt.show()
+        if plot_path is None and headless:
+            plot_path = 'fitness_history.png'
+        if plot_path is not None:
+            plt.savefig(plot_path)
+        if headless:
+            plt.close(figure)
+        else:
+            plt.show()
@@ -0,0 +1,84 @@
+import heapq
+
+
+class IndexedPopulation:
+    """
+    population of fixed size with indexed access for steady state genetic algorithms: a max and a min heap of the
+    slots find the best and worst individual in O(log P) (replaced slots leave stale heap entries which are skipped
+    lazily) and a count of the genomes answers membership checks in O(1)
+    """
+
+    def __init__(self, population, fitness_values):
+        """
+        creates an indexed population
+        :param population: list of hashable hypotheses
+        :param fitness_values: list of their fitness values
+        """
+        self.population = list(population)
+        self.fitness_values = list(fitness_values)
+        self.versions = [0] * len(self.population)
+        self.counts = {}
+        for hypothesis in self.population:
+            self.counts[hypothesis] = self.counts.get(hypothesis, 0) + 1
+        self.best_heap = None
+        self.worst_heap = None
+        self.rebuild_heaps()
+
+    def __len__(self):
+        return len(self.population)
+
+    def __contains__(self, hypothesis):
+        return hypothesis in self.counts
+
+    def rebuild_heaps(self):
+        """
+        rebuilds both heaps from the current slots without stale entries
+        """
+        self.best_heap = [(-fitness, 0, slot) for slot, fitness in enumerate(self.fitness_values)]
+        self.worst_heap = [(fitness, 0, slot) for slot, fitness in enumerate(self.fitness_values)]
+        heapq.heapify(self.best_heap)
+        heapq.heapify(self.worst_heap)
+        self.versions = [0] * len(self.population)
+
+    def best_slot(self):
+        """
+        :return: slot of an individual with the highest fitness
+        """
+        heap = self.best_heap
+        while heap[0][1] != self.versions[heap[0][2]]:
+            heapq.heappop(heap)
+        return heap[0][2]
+
+    def worst_slot(self):
+        """
+        :return: slot of an individual with the lowest fitness
+        """
+        heap = self.worst_heap
+        while heap[0][1] != self.versions[heap[0][2]]:
+            heapq.heappop(heap)
+        return heap[0][2]
+
+    def replace(self, slot, hypothesis, fitness):
+        """
+        replaces the individual of a slot
+        :param slot: slot index
+        :param hypothesis: new hypothesis
+        :param fitness: its fitness
+        """
+        old_hypothesis = self.population[slot]
+        if self.counts[old_hypothesis] == 1:
+            del self.counts[old_hypothesis]
+        else:
+            self.counts[old_hypothesis] -= 1
+        self.counts[hypothesis] = self.counts.get(hypothesis, 0) + 1
+        self.population[slot] = hypothesis
+        self.fitness_values[slot] = fitness
+
+        # stale entries are dropped by a rebuild once they make up half of the heaps
+        if max(len(self.best_heap), len(self.worst_heap)) > 2 * len(self.population):
+            self.rebuild_heaps()
+        else:
+            version = self.versions[slot] + 1
+            self.versions[slot] = version
+            heapq.heappush(self.best_heap, (-fitness, version, slot))
+            heapq.heappush(self.worst_heap, (fitness, version, slot))
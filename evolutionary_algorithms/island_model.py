@@ -0,0 +1,208 @@
+import multiprocessing
+import queue
+import random
+import traceback
+
+import numpy as np
+
+from evolutionary_algorithms.genetic_algorithm import GeneticAlgorithm
+from telemetry import Telemetry
+
+# migration topologies
+RING = 'ring'
+FULLY_CONNECTED = 'fully_connected'
+
+# seconds between two checks of the stop event while waiting for migrants or results
+POLL_INTERVAL = 0.1
+
+
+class IslandModel:
+    """
+    genetic algorithm with several populations (islands) in separate processes, every migration_interval generations
+    each island sends copies of its best individuals to its neighbours, which replace their worst individuals, the
+    run stops on all islands as soon as one island reaches the fitness threshold or the optimum
+    """
+
+    def __init__(self, populations, fitness, cross_over, mutate, fitness_threshold, parameters, optimum=None,
+                 topology=RING, migration_interval=10, migrants=1, seed=None, observers=None):
+        """
+        creates an island model, the functions have to be picklable (defined at module level)
+        :param populations: list of populations, one per island
+        :param fitness: fitness function
+        :param cross_over: cross over function
+        :param mutate: mutate function
+        :param fitness_threshold: fitness value to end when reached
+        :param parameters: list of (r, m) tuples, one per island
+        :param optimum: optimum hypothesis
+        :param topology: 'ring' (island k sends to k + 1) or 'fully_connected' (every island sends to all others)
+        :param migration_interval: generations between two migrations
+        :param migrants: number of best individuals sent to each neighbour
+        :param seed: seed of the random numbers of the islands
+        :param observers: list of telemetry observers (f.e. PrintObserver), notified about the results of the islands
+        """
+        if len(parameters) != len(populations):
+            raise ValueError('one (r, m) tuple per population is needed')
+        if topology not in (RING, FULLY_CONNECTED):
+            raise ValueError('topology must be ring or fully_connected')
+        self.populations = populations
+        self.fitness = fitness
+        self.cross_over = cross_over
+        self.mutate = mutate
+        self.fitness_threshold = fitness_threshold
+        self.parameters = parameters
+        self.optimum = optimum
+        self.topology = topology
+        self.migration_interval = migration_interval
+        self.migrants = migrants
+        self.seed = seed
+        self.telemetry = Telemetry(observers)
+        self.statistics = None
+        self.island_results = None
+        self.best_hypothesis = None
+        self.best_island = None
+
+    def get_neighbours(self, island_index):
+        """
+        :return: indices of the islands the given island sends its migrants to
+        """
+        islands = len(self.populations)
+        if islands == 1:
+            return []
+        if self.topology == RING:
+            return [(island_index + 1) % islands]
+        return [index for index in range(islands) if index != island_index]
+
+    def run(self, max_generations=None):
+        """
+        runs all islands until one of them reaches the fitness threshold or the optimum
+        :param max_generations: optional maximal number of generations of each island
+        :return: best hypothesis of all islands
+        """
+        islands = len(self.populations)
+        best_fitness = max(self.fitness(h, self.optimum) for population in self.populations for h in population)
+        self.telemetry.start(self, 'Genetic Algorithm ({} islands)'.format(islands), best_fitness)
+        rng = random.Random(self.seed)
+        seeds = [rng.getrandbits(32) if self.seed is not None else None for island_index in range(islands)]
+        incoming = [0] * islands
+        for island_index in range(islands):
+            for neighbour in self.get_neighbours(island_index):
+                incoming[neighbour] += 1
+
+        inboxes = [multiprocessing.Queue() for island_index in range(islands)]
+        results = multiprocessing.Queue()
+        stop_event = multiprocessing.Event()
+        functions = (self.fitness, self.cross_over, self.mutate)
+        processes = [multiprocessing.Process(target=_run_island, args=(
+            island_index, self.populations[island_index], functions, self.fitness_threshold,
+            self.parameters[island_index], self.optimum, self.migration_interval, self.migrants, max_generations,
+            inboxes, self.get_neighbours(island_index), incoming[island_index], stop_event, results,
+            seeds[island_index])) for island_index in range(islands)]
+        for process in processes:
+            process.start()
+
+        self.island_results = [None] * islands
+        try:
+            for collected in range(islands):
+                result = self.receive_result(results, processes)
+                if result[0] == 'error':
+                    raise RuntimeError('island {} failed:\n{}'.format(result[1], result[2]))
+                island_index, hypothesis, fitness, generations = result
+                self.island_results[island_index] = {'best_hypothesis': hypothesis, 'fitness': fitness,
+                                                     'generations': generations}
+                if self.best_hypothesis is None or fitness > self.island_results[self.best_island]['fitness']:
+                    self.best_hypothesis = hypothesis
+                    self.best_island = island_index
+                if fitness > best_fitness:
+                    best_fitness = fitness
+                    self.telemetry.improvement(generations, best_fitness)
+        finally:
+            stop_event.set()
+            for process in processes:
+                process.join(POLL_INTERVAL * 10)
+                if process.is_alive():
+                    process.terminate()
+
+        generations = max(result['generations'] for result in self.island_results)
+        self.statistics = self.telemetry.finish(generations, 0, 0, best_fitness)
+        return self.best_hypothesis
+
+    def receive_result(self, results, processes):
+        """
+        waits for the next result of an island
+        :raise RuntimeError: if an island process died without result
+        """
+        while True:
+            try:
+                return results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                for island_index, process in enumerate(processes):
+                    if process.exitcode not in (None, 0):
+                        raise RuntimeError('island {} died with exit code {}'.format(island_index,
+                                                                                    process.exitcode))
+
+
+def _run_island(island_index, population, functions, fitness_threshold, parameters, optimum, migration_interval,
+                migrants, max_generations, inboxes, neighbours, incoming, stop_event, results, seed):
+    """
+    runs one island in its own process and puts (island index, best hypothesis, fitness, generations) or
+    ('error', island index, traceback) into results
+    """
+    for inbox in inboxes:
+        # migrants left in the queues at the end must not block the exit of the process
+        inbox.cancel_join_thread()
+    try:
+        random.seed(seed)
+        np.random.seed(seed % 2 ** 32 if seed is not None else None)
+        fitness, cross_over, mutate = functions
+        r, m = parameters
+        genetic_algorithm = GeneticAlgorithm(population, fitness, cross_over, mutate, fitness_threshold, r, m, optimum)
+
+        while not genetic_algorithm.is_finished() and not stop_event.is_set():
+            if max_generations is not None and genetic_algorithm.generation_counter >= max_generations:
+                break
+            epoch_end = genetic_algorithm.generation_counter + migration_interval
+            genetic_algorithm.run(epoch_end if max_generations is None else min(epoch_end, max_generations),
+                                  stop_event)
+            if genetic_algorithm.is_finished():
+                stop_event.set()
+                break
+            if stop_event.is_set() or not neighbours:
+                continue
+
+            fitness_dict = genetic_algorithm.fitness_dict
+            emigrants = sorted(fitness_dict, key=fitness_dict.get, reverse=True)[:migrants]
+            for neighbour in neighbours:
+                inboxes[neighbour].put(emigrants)
+            # one message per incoming neighbour and epoch, islands with few distinct genomes send fewer migrants
+            immigrants = []
+            messages = 0
+            while messages < incoming and not stop_event.is_set():
+                try:
+                    immigrants += inboxes[island_index].get(timeout=POLL_INTERVAL)
+                    messages += 1
+                except queue.Empty:
+                    pass
+            immigrate(genetic_algorithm, immigrants)
+
+        results.put((island_index, genetic_algorithm.best_hypothesis,
+                     genetic_algorithm.fitness_dict[genetic_algorithm.best_hypothesis],
+                     genetic_algorithm.generation_counter))
+    except BaseException:
+        stop_event.set()
+        results.put(('error', island_index, traceback.format_exc()))
+
+
+def immigrate(genetic_algorithm, immigrants):
+    """
+    replaces the worst individuals of the population of a genetic algorithm with immigrants
+    :param genetic_algorithm: GeneticAlgorithm
+    :param immigrants: list of hypotheses, at most population size - 1 are taken so the best individual survives
+    """
+    population = genetic_algorithm.population
+    immigrants = immigrants[:len(population) - 1]
+    fitness_dict = genetic_algorithm.fitness_dict
+    worst = sorted(range(len(population)), key=lambda index: fitness_dict[population[index]])[:len(immigrants)]
+    for index, immigrant in zip(worst, immigrants):
+        population[index] = immigrant
+    genetic_algorithm.update_fitness_dict()
+    genetic_algorithm.best_hypothesis = max(genetic_algorithm.fitness_dict, key=genetic_algorithm.fitness_dict.get)
@@ -0,0 +1,59 @@
+import math
+import os
+from concurrent.futures import Executor, Future
+
+# chunks per cpu if no chunk size is given, more chunks balance uneven fitness costs better
+CHUNKS_PER_CPU = 4
+
+
+class SerialExecutor(Executor):
+    """
+    executor which runs each submitted function immediately in the calling thread, a local stand-in for thread,
+    process or remote worker pools with the same interface (f.e. for debugging or tests of the parallel code path)
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as error:
+            future.set_exception(error)
+        return future
+
+
+def evaluate_chunk(fitness, hypotheses, optimum):
+    """
+    evaluates a chunk of hypotheses in a worker
+    :return: list of fitness values
+    """
+    return [fitness(hypothesis, optimum) for hypothesis in hypotheses]
+
+
+def evaluate_fitness(fitness, hypotheses, optimum, executor=None, chunk_size=None):
+    """
+    evaluates the fitness of hypotheses in chunks with an executor (f.e. ThreadPoolExecutor, ProcessPoolExecutor or
+    SerialExecutor), for process pools fitness, hypotheses and optimum have to be picklable
+    :param fitness: fitness function (hypothesis, optimum) -> fitness
+    :param hypotheses: list of hypotheses
+    :param optimum: optimum passed to the fitness function
+    :param executor: executor with a submit method, None evaluates in the calling thread
+    :param chunk_size: hypotheses per submitted task, defaults to an even split into CHUNKS_PER_CPU chunks per cpu
+    :return: list of fitness values in the order of hypotheses, the first failing chunk raises its exception after
+             the not yet started chunks are cancelled
+    """
+    if executor is None or len(hypotheses) == 0:
+        return evaluate_chunk(fitness, hypotheses, optimum)
+    if chunk_size is None:
+        chunk_size = math.ceil(len(hypotheses) / (CHUNKS_PER_CPU * (os.cpu_count() or 1)))
+
+    futures = [executor.submit(evaluate_chunk, fitness, hypotheses[start:start + chunk_size], optimum)
+               for start in range(0, len(hypotheses), chunk_size)]
+    fitness_values = []
+    try:
+        for future in futures:
+            fitness_values += future.result()
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    return fitness_values
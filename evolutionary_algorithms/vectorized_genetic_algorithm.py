@@ -0,0 +1,180 @@
+import numpy as np
+
+from telemetry import Telemetry
+from utils import DiscreteSampler
+
+# selection strategies
+FITNESS_PROPORTIONAL = 'fitness_proportional'
+RANK = 'rank'
+
+# cross over strategies
+ONE_POINT = 'one_point'
+UNIFORM = 'uniform'
+
+# draws of a new mother from the selection distribution if she equals the father, afterwards the pair is accepted
+MAX_PARENT_REDRAWS = 3
+
+
+class VectorizedGeneticAlgorithm:
+    """
+    a genetic algorithm on a population stored as (P, L) numpy array of genes (f.e. bits), each generation is built
+    with batched array operations: the best individual is kept, the rest of the generation is filled with selected
+    individuals and the children of selected parents, afterwards single genes of random individuals are mutated
+    """
+
+    def __init__(self, population, fitness, fitness_threshold, r, m, optimum=None, selection=FITNESS_PROPORTIONAL,
+                 cross_over=ONE_POINT, seed=None, observers=None, sample_interval=1):
+        """
+        generates a new vectorized genetic algorithm
+        :param population: (P, L) array of binary genes (0 and 1)
+        :param fitness: vectorized fitness function (population array, optimum) -> (P,) array of fitness values
+        :param fitness_threshold: fitness value to end when reached
+        :param r: share of the population to replace with children of cross over
+        :param m: share of the population to mutate with one gene
+        :param optimum: optimum hypothesis as (L,) array
+        :param selection: 'fitness_proportional' or 'rank'
+        :param cross_over: 'one_point' or 'uniform'
+        :param seed: seed of the random number generator
+        :param observers: list of telemetry observers (f.e. PrintObserver), silent by default
+        :param sample_interval: generations between two progress notifications of the observers
+        """
+        if selection not in (FITNESS_PROPORTIONAL, RANK):
+            raise ValueError('selection must be fitness_proportional or rank')
+        if cross_over not in (ONE_POINT, UNIFORM):
+            raise ValueError('cross over must be one_point or uniform')
+        self.population = np.array(population, dtype=np.uint8)
+        self.fitness = fitness
+        self.fitness_threshold = fitness_threshold
+        self.r = r
+        self.m = m
+        self.p, self.length = self.population.shape
+        self.optimum = None if optimum is None else np.asarray(optimum, dtype=np.uint8)
+        self.selection = selection
+        self.cross_over = cross_over
+        self.rng = np.random.default_rng(seed)
+        self.telemetry = Telemetry(observers, sample_interval)
+        self.statistics = None
+        # create first generation
+        self.generation_counter = 1
+        self.fitness_values = np.asarray(self.fitness(self.population, self.optimum))
+        self.best_hypothesis = None
+        self.best_fitness_generation_list = []
+        self.update_best_hypothesis()
+
+    def run(self, max_generations=None, stop_event=None):
+        """
+        runs generations until the fitness threshold or the optimum is reached
+        :param max_generations: optional maximal number of generations
+        :param stop_event: optional threading or multiprocessing Event, the run stops after the generation in which it
+                           is set
+        :return: best hypothesis
+        """
+        telemetry = self.telemetry
+        best_fitness = self.best_fitness_generation_list[-1]
+        telemetry.start(self, 'Vectorized Genetic Algorithm', best_fitness)
+        next_sample = self.generation_counter + telemetry.sample_interval
+        children = 2 * int(round(self.r * self.p / 2))
+        selections = self.p - 1 - children
+        if selections < 0:
+            raise ValueError('r is too large to keep the best hypothesis')
+
+        while not self.is_finished() and (max_generations is None or self.generation_counter < max_generations) \
+                and (stop_event is None or not stop_event.is_set()):
+            sampler = self.build_sampler()
+            selected = self.population[sampler.sample_batch(selections)]
+            fathers = sampler.sample_batch(children // 2)
+            mothers = sampler.sample_batch(children // 2)
+            # a mother equal to the father is drawn again from the same distribution, a few times at most
+            same = fathers == mothers
+            for redraw in range(MAX_PARENT_REDRAWS):
+                if not same.any():
+                    break
+                mothers[same] = sampler.sample_batch(np.count_nonzero(same))
+                same = fathers == mothers
+            new_generation = np.concatenate((self.best_hypothesis[np.newaxis], selected,
+                                             self.cross_over_parents(self.population[fathers],
+                                                                     self.population[mothers])))
+            self.mutate_population(new_generation)
+
+            # update population and fitness values
+            self.population = new_generation
+            self.fitness_values = np.asarray(self.fitness(self.population, self.optimum))
+            self.generation_counter += 1
+            self.update_best_hypothesis()
+
+            generation_best_fitness = self.best_fitness_generation_list[-1]
+            if generation_best_fitness > best_fitness:
+                best_fitness = generation_best_fitness
+                telemetry.improvement(self.generation_counter, best_fitness)
+            if self.generation_counter == next_sample:
+                telemetry.sample(self.generation_counter, 0, 0, generation_best_fitness)
+                next_sample += telemetry.sample_interval
+
+        self.statistics = telemetry.finish(self.generation_counter, 0, 0, self.best_fitness_generation_list[-1])
+        return self.best_hypothesis
+
+    def is_finished(self):
+        """
+        :return: True if the fitness threshold is reached or the optimum is part of the population
+        """
+        if self.best_fitness_generation_list[-1] >= self.fitness_threshold:
+            return True
+        return self.optimum is not None and bool(np.any(np.all(self.population == self.optimum, axis=1)))
+
+    def build_sampler(self):
+        """
+        builds the roulette wheel of the population, weighted by fitness or by rank (worst rank 1, best rank P)
+        :return: DiscreteSampler
+        """
+        if self.selection == RANK:
+            ranks = np.empty(self.p)
+            ranks[np.argsort(self.fitness_values, kind='stable')] = np.arange(1, self.p + 1)
+            return DiscreteSampler(ranks, rng=self.rng)
+        return DiscreteSampler(self.fitness_values, rng=self.rng)
+
+    def cross_over_parents(self, fathers, mothers):
+        """
+        creates two children of each pair of parents
+        :param fathers: (K, L) array
+        :param mothers: (K, L) array
+        :return: (2K, L) array of children
+        """
+        if self.cross_over == ONE_POINT:
+            cross_over_points = self.rng.integers(1, self.length, len(fathers))
+            masks = np.arange(self.length) < cross_over_points[:, np.newaxis]
+        else:
+            masks = self.rng.random(fathers.shape) < 0.5
+        return np.concatenate((np.where(masks, fathers, mothers), np.where(masks, mothers, fathers)))
+
+    def mutate_population(self, population):
+        """
+        flips one random gene of int(P * m) random individuals in place, an individual may be drawn several times
+        :param population: (P, L) array
+        """
+        mutations = int(self.p * self.m)
+        rows = self.rng.integers(0, len(population), mutations)
+        columns = self.rng.integers(0, self.length, mutations)
+        np.bitwise_xor.at(population, (rows, columns), 1)
+
+    def update_best_hypothesis(self):
+        """
+        updates self.best_hypothesis with the best individual of the actual population
+        """
+        best_index = int(np.argmax(self.fitness_values))
+        self.best_hypothesis = self.population[best_index].copy()
+        self.best_fitness_generation_list.append(self.fitness_values[best_index].item())
+
+    def get_fitness_history(self):
+        """
+        :return: array of the best fitness of each generation
+        """
+        return np.array(self.best_fitness_generation_list)
+
+    def print_finish(self):
+        """
+        prints information after finish
+        """
+        print('-' * 150)
+        print('Target reachted after {} generations'.format(self.generation_counter))
+        print('Best hypothesis: {}, fitness: {}'.format(''.join(map(str, self.best_hypothesis)),
+                                                        self.best_fitness_generation_list[-1]))
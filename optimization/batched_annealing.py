@@ -0,0 +1,153 @@
+import numpy as np
+
+from optimization.distance_matrix import DistanceMatrix
+from optimization.stopping_criteria import TEMPERATURE, TIME, get_end_time, time_is_up
+from optimization.tsp_methods import INSTANCE_TYPES, get_distances_function
+from telemetry import Telemetry
+
+
+class BatchedSimulatedAnnealer:
+    """
+    simulated annealing of several independent chains in lockstep, the tours are stored as (chains, n) array and each
+    step proposes, evaluates and applies one swap per chain with numpy operations
+    """
+
+    def __init__(self, chains, seed=None, observers=None, sample_interval=1000):
+        """
+        creates a batched simulated annealing algorithm
+        :param chains: number of chains advanced together
+        :param seed: seed of the random number generator
+        :param observers: list of telemetry observers (f.e. PrintObserver), silent by default
+        :param sample_interval: steps between two progress notifications of the observers
+        """
+        self.chains = chains
+        self.rng = np.random.default_rng(seed)
+        self.telemetry = Telemetry(observers, sample_interval)
+        self.statistics = None
+        self.data = None
+        self.tours = None
+        self.fitness_values = None
+        self.best_tours = None
+        self.best_fitness_values = None
+        self.optimal_hypothesis = None
+        self.iterations_needed = None
+        self.stop_reason = None
+
+    def run(self, data, temp, epsilon, start_tours=None, time_budget=None, deadline=None):
+        """
+        runs the simulated annealing algorithm for all chains with linear cooling
+        :param data: DistanceMatrix, CoordinateInstance or two dimensional list
+        :param temp: start temperature
+        :param epsilon: value to decrease the temperature in each iteration
+        :param start_tours: optional (chains, n) array of start tours, random permutations by default
+        :param time_budget: optional seconds the run may take
+        :param deadline: optional time.time() timestamp the run has to be finished by
+        :return: optimal hypothesis of all chains and number of iterations
+        """
+        end_time = get_end_time(time_budget, deadline)
+        if not isinstance(data, INSTANCE_TYPES):
+            data = DistanceMatrix.from_list(data)
+        self.data = data
+        distances = get_distances_function(data)
+        number_of_nodes = len(data)
+
+        if start_tours is None:
+            start_tours = self.rng.permuted(np.tile(np.arange(number_of_nodes), (self.chains, 1)), axis=1)
+        tours = np.array(start_tours, dtype=np.int64)
+        fitness_values = -distances(tours[:, :-1], tours[:, 1:]).sum(axis=1)
+        best_tours = tours.copy()
+        best_fitness_values = fitness_values.copy()
+        best_fitness = fitness_values.max().item()
+        telemetry = self.telemetry
+        telemetry.start(self, 'Batched Simulated Annealing ({} chains)'.format(self.chains), best_fitness, temp)
+        next_sample = telemetry.sample_interval
+        rows = np.arange(self.chains)
+        accepted_moves = 0
+        i = 0
+        self.stop_reason = TEMPERATURE
+
+        while number_of_nodes > 1:  # do while
+            deltas, first_indices, second_indices = self.swap_fitness_deltas(tours, distances)
+            i += 1
+
+            accepted = (deltas > 0) | (self.rng.random(self.chains) < np.exp(np.minimum(deltas / temp, 0)))
+            accepted_rows = rows[accepted]
+            accepted_moves += len(accepted_rows)
+            first_accepted = first_indices[accepted]
+            second_accepted = second_indices[accepted]
+            tours[accepted_rows, first_accepted], tours[accepted_rows, second_accepted] = \
+                tours[accepted_rows, second_accepted], tours[accepted_rows, first_accepted]
+            fitness_values += np.where(accepted, deltas, 0)
+
+            improved = fitness_values > best_fitness_values
+            if improved.any():
+                best_tours[improved] = tours[improved]
+                best_fitness_values[improved] = fitness_values[improved]
+                if best_fitness_values.max() > best_fitness:
+                    best_fitness = best_fitness_values.max().item()
+                    telemetry.improvement(i, best_fitness, temp)
+            temp -= epsilon
+
+            # iterations and moves are counted over all chains
+            if i == next_sample:
+                telemetry.sample(i * self.chains, accepted_moves, i * self.chains - accepted_moves,
+                                 fitness_values.max().item(), temp)
+                next_sample += telemetry.sample_interval
+
+            if temp < epsilon:  # do while
+                break
+            if time_is_up(i, end_time):
+                self.stop_reason = TIME
+                break
+
+        self.statistics = telemetry.finish(i * self.chains, accepted_moves, i * self.chains - accepted_moves,
+                                           fitness_values.max().item(), temp)
+        self.tours = tours
+        self.fitness_values = fitness_values
+        self.best_tours = best_tours
+        self.best_fitness_values = best_fitness_values
+        self.optimal_hypothesis = best_tours[np.argmax(best_fitness_values)].tolist()
+        self.iterations_needed = i
+        return self.optimal_hypothesis, i
+
+    def swap_fitness_deltas(self, tours, distances):
+        """
+        proposes one random swap per chain and computes its fitness change from the (at most four) edges touching the
+        swapped indices
+        :param tours: (chains, n) array of tours
+        :param distances: vectorized distance function
+        :return: fitness deltas, first (smaller) and second swapped index of each chain
+        """
+        number_of_nodes = tours.shape[1]
+        first_indices = self.rng.integers(0, number_of_nodes, self.chains)
+        second_indices = self.rng.integers(0, number_of_nodes - 1, self.chains)
+        second_indices += second_indices >= first_indices
+        first_indices, second_indices = np.minimum(first_indices, second_indices), \
+            np.maximum(first_indices, second_indices)
+
+        # edge k connects the indices k and k + 1, the edge between adjacent indices must be counted once
+        edges = np.stack([first_indices - 1, first_indices, second_indices - 1, second_indices], axis=1)
+        valid = (edges >= 0) & (edges < number_of_nodes - 1)
+        valid[:, 2] &= second_indices != first_indices + 1
+        edges = np.clip(edges, 0, number_of_nodes - 2)
+
+        rows = np.arange(self.chains)[:, np.newaxis]
+        first_nodes = tours[rows, first_indices[:, np.newaxis]]
+        second_nodes = tours[rows, second_indices[:, np.newaxis]]
+
+        def nodes_after_swap(positions):
+            nodes = tours[rows, positions]
+            nodes = np.where(positions == first_indices[:, np.newaxis], second_nodes, nodes)
+            return np.where(positions == second_indices[:, np.newaxis], first_nodes, nodes)
+
+        distance_before = distances(tours[rows, edges], tours[rows, edges + 1])
+        distance_after = distances(nodes_after_swap(edges), nodes_after_swap(edges + 1))
+        deltas = np.where(valid, distance_before - distance_after, 0).sum(axis=1)
+        return deltas, first_indices, second_indices
+
+    def print_result(self):
+        print('-' * 20 + 'Batched Simulated Annealing' + '-' * 20)
+        print('Optimal fitness:', self.best_fitness_values.max())
+        print('Iterations:', self.iterations_needed)
+        print('Shortest round trip:', str(self.optimal_hypothesis),
+              'distance:', self.best_fitness_values.max() * -1)
@@ -0,0 +1,229 @@
+import argparse
+import json
+import math
+import multiprocessing
+import platform
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from optimization.batched_annealing import BatchedSimulatedAnnealer
+from optimization.cooling_schedules import GeometricCooling
+from optimization.coordinate_instance import CoordinateInstance
+from optimization.hill_climbing import HillClimber
+from optimization.neighbour_list_search import NeighbourListSearch
+from optimization.simulated_annealing import SimulatedAnnealer
+from optimization.tsp_methods import *
+from utils import peak_memory_mb
+
+# benchmark parameters
+SIZES = [100, 1000, 5000, 20000, 50000]
+SEED = 42
+MAX_COORDINATE = 10000
+TIME_BUDGET = 10  # seconds per run
+# target tour length relative to the expected optimal length of random uniform instances
+TARGET_FACTOR = 1.25
+# Beardwood-Halton-Hammersley constant: optimal tour length ~ 0.7124 * sqrt(n * area)
+BHH_CONSTANT = 0.7124
+# only for simulated annealing
+SA_ALPHA = 0.99995
+# only for batched simulated annealing
+BATCHED_CHAINS = 32
+# steps timed before the run to stretch the linear cooling over the time budget
+BATCHED_PROBE_STEPS = 200
+# regressions above this share are reported by compare
+REGRESSION_TOLERANCE = 0.1
+OUTPUT = 'optimization_benchmark.json'
+
+
+def run_hill_climbing_swap(instance, time_budget, seed):
+    hill_climber = HillClimber(fitness, random_swap, build_start_hypothesis, swap_fitness_delta,
+                               undo_swap)
+    hypothesis, iterations = hill_climber.run(instance, None, time_budget=time_budget)
+    return hypothesis, hill_climber.statistics
+
+
+def run_hill_climbing_two_opt(instance, time_budget, seed):
+    hill_climber = HillClimber(fitness, None, build_start_hypothesis)
+    hypothesis, steps = hill_climber.run_local_search(instance, first_two_opt_move, reverse_segment,
+                                                      time_budget=time_budget)
+    return hypothesis, hill_climber.statistics
+
+
+def run_hill_climbing_neighbour_lists(instance, time_budget, seed):
+    search = NeighbourListSearch(instance)
+    hill_climber = HillClimber(fitness, None, build_start_hypothesis)
+    hypothesis, steps = hill_climber.run_local_search(instance, search.find_improving_move, search.apply_move,
+                                                      time_budget=time_budget)
+    return hypothesis, hill_climber.statistics
+
+
+def run_simulated_annealing(instance, time_budget, seed):
+    simulated_annealer = SimulatedAnnealer(fitness, random_swap, build_start_hypothesis,
+                                           swap_fitness_delta, undo_swap)
+    hypothesis, iterations = simulated_annealer.run(instance, None, schedule=GeometricCooling(SA_ALPHA),
+                                                    time_budget=time_budget)
+    return hypothesis, simulated_annealer.statistics
+
+
+def run_batched_simulated_annealing(instance, time_budget, seed):
+    temp = MAX_COORDINATE / 10
+    probe_start = time.perf_counter()
+    BatchedSimulatedAnnealer(BATCHED_CHAINS, seed=seed).run(instance, temp, temp / BATCHED_PROBE_STEPS)
+    probe_seconds = time.perf_counter() - probe_start
+    # the probe counts towards the budget like the setup of the other strategies
+    remaining_budget = max(0.0, time_budget - probe_seconds)
+    steps = max(1, int(BATCHED_PROBE_STEPS * remaining_budget / probe_seconds))
+    batched_annealer = BatchedSimulatedAnnealer(BATCHED_CHAINS, seed=seed)
+    hypothesis, iterations = batched_annealer.run(instance, temp, temp / steps, time_budget=remaining_budget)
+    return hypothesis, batched_annealer.statistics
+
+
+# strategy name -> (run function, largest instance it is run on)
+STRATEGIES = {
+    'hill_climbing_swap': (run_hill_climbing_swap, None),
+    'hill_climbing_two_opt': (run_hill_climbing_two_opt, 5000),
+    'hill_climbing_neighbour_lists': (run_hill_climbing_neighbour_lists, None),
+    'simulated_annealing': (run_simulated_annealing, None),
+    'batched_simulated_annealing': (run_batched_simulated_annealing, 20000)
+}
+
+
+def generate_instance(number_of_nodes, seed):
+    """
+    generates the reproducible random instance of a benchmark size
+    """
+    return CoordinateInstance.generate(number_of_nodes, MAX_COORDINATE, seed=seed + number_of_nodes)
+
+
+def target_length(number_of_nodes):
+    """
+    returns the tour length a run has to reach, relative to the expected optimum of a random uniform instance
+    """
+    return TARGET_FACTOR * BHH_CONSTANT * math.sqrt(number_of_nodes * MAX_COORDINATE ** 2)
+
+
+def run_case(strategy, number_of_nodes, seed, time_budget):
+    """
+    runs one strategy on one instance size, meant to be executed in a fresh process to measure its peak memory
+    :return: result dictionary
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    setup_start = time.perf_counter()
+    instance = generate_instance(number_of_nodes, seed)
+    setup_seconds = time.perf_counter() - setup_start
+
+    run_start = time.perf_counter()
+    hypothesis, statistics = STRATEGIES[strategy][0](instance, time_budget, seed)
+    seconds = time.perf_counter() - run_start
+
+    target = target_length(number_of_nodes)
+    times_to_target = [history_seconds for iteration, history_seconds, history_fitness
+                       in statistics.best_fitness_history if -history_fitness <= target]
+    return {
+        'strategy': strategy,
+        'nodes': number_of_nodes,
+        'seed': seed,
+        'time_budget': time_budget,
+        'setup_seconds': setup_seconds,
+        'seconds': seconds,
+        'iterations': statistics.iterations,
+        'iterations_per_second': statistics.iterations_per_second(),
+        'acceptance_rate': statistics.acceptance_rate(),
+        'start_length': -statistics.best_fitness_history[0][2],
+        'final_length': instance.tour_length(hypothesis),
+        'target_length': target,
+        'seconds_to_target': times_to_target[0] if times_to_target else None,
+        'peak_memory_mb': peak_memory_mb()
+    }
+
+
+def run_benchmark(sizes, strategies, seed, time_budget):
+    """
+    runs every strategy on every size, each case in its own process
+    :return: benchmark results with metadata
+    """
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for number_of_nodes in sizes:
+        for strategy in strategies:
+            max_nodes = STRATEGIES[strategy][1]
+            if max_nodes is not None and number_of_nodes > max_nodes:
+                continue
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                result = executor.submit(run_case, strategy, number_of_nodes, seed, time_budget).result()
+            print_result(result)
+            results.append(result)
+
+    return {
+        'metadata': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'seed': seed,
+            'time_budget': time_budget
+        },
+        'results': results
+    }
+
+
+def print_result(result):
+    print('{strategy} n={nodes}: {iterations_per_second:.0f} iterations/s, length {final_length} '
+          '(target {target_length:.0f}'.format(**result), end='')
+    if result['seconds_to_target'] is not None:
+        print(' reached after {:.3f}s'.format(result['seconds_to_target']), end='')
+    print(')', end='')
+    if result['peak_memory_mb'] is not None:
+        print(', peak memory {:.1f} MB'.format(result['peak_memory_mb']), end='')
+    print()
+
+
+def compare(old_results, new_results):
+    """
+    prints the changes of the throughput and the tour quality between two benchmark results
+    :param old_results: results of the older version
+    :param new_results: results of the newer version
+    :return: list of (strategy, nodes, metric, old value, new value) of regressions
+    """
+    old_cases = {(result['strategy'], result['nodes']): result for result in old_results['results']}
+    regressions = []
+    for result in new_results['results']:
+        old = old_cases.get((result['strategy'], result['nodes']))
+        if old is None:
+            continue
+        throughput = result['iterations_per_second'] / old['iterations_per_second'] \
+            if old['iterations_per_second'] > 0 else float('inf')
+        quality = result['final_length'] / old['final_length']
+        print('{} n={}: iterations/s x{:.2f}, final length x{:.3f}'.format(result['strategy'], result['nodes'],
+                                                                          throughput, quality))
+        if throughput < 1 - REGRESSION_TOLERANCE:
+            regressions.append((result['strategy'], result['nodes'], 'iterations_per_second',
+                                old['iterations_per_second'], result['iterations_per_second']))
+        if quality > 1 + REGRESSION_TOLERANCE:
+            regressions.append((result['strategy'], result['nodes'], 'final_length', old['final_length'],
+                                result['final_length']))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='benchmark of the traveling salesman optimizers')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--strategies', nargs='+', default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--time-budget', type=float, default=TIME_BUDGET)
+    parser.add_argument('--output', default=OUTPUT)
+    parser.add_argument('--compare', help='results of an older version to compare with')
+    args = parser.parse_args()
+
+    benchmark_results = run_benchmark(args.sizes, args.strategies, args.seed, args.time_budget)
+    with open(args.output, 'w') as file:
+        json.dump(benchmark_results, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            for regression in compare(json.load(file), benchmark_results):
+                print('Regression:', regression)
@@ -0,0 +1,49 @@
+import json
+import random
+
+import numpy as np
+
+from utils import write_atomically
+
+# version of the checkpoint file layout
+CHECKPOINT_VERSION = 1
+# iterations between two checkpoints of a run
+CHECKPOINT_INTERVAL = 1000000
+
+
+def save_checkpoint(path, state, hypotheses, rng=random):
+    """
+    writes the state of a run atomically to an uncompressed numpy .npz file: the hypotheses as integer arrays, the
+    state as json metadata and the state of the random generator, a crash while writing leaves the previous
+    checkpoint intact
+    :param path: path of the checkpoint file
+    :param state: json serializable dictionary of counters, fitness values and parameters of the run
+    :param hypotheses: dictionary name -> hypothesis (sequence of numbers), None values are skipped
+    :param rng: random generator whose state is saved (the random module by default)
+    """
+    version, internal_state, gauss_next = rng.getstate()
+    metadata = dict(state, format_version=CHECKPOINT_VERSION, random_version=version, gauss_next=gauss_next)
+    arrays = {name: np.asarray(hypothesis) for name, hypothesis in hypotheses.items() if hypothesis is not None}
+    arrays['metadata'] = np.array(json.dumps(metadata, default=lambda value: value.item()))
+    arrays['random_state'] = np.array(internal_state, dtype=np.uint32)
+
+    write_atomically(path, lambda file: np.savez(file, **arrays))
+
+
+def load_checkpoint(path, rng=random):
+    """
+    reads a checkpoint written by save_checkpoint and restores the state of the random generator
+    :param path: path of the checkpoint file
+    :param rng: random generator whose state is restored (the random module by default)
+    :return: state dictionary and dictionary name -> hypothesis (list)
+    """
+    with np.load(path, allow_pickle=False) as checkpoint:
+        metadata = json.loads(str(checkpoint['metadata']))
+        if metadata.pop('format_version') != CHECKPOINT_VERSION:
+            raise ValueError('unsupported checkpoint format of ' + str(path))
+        internal_state = tuple(int(value) for value in checkpoint['random_state'])
+        hypotheses = {name: checkpoint[name].tolist() for name in checkpoint.files
+                      if name not in ('metadata', 'random_state')}
+
+    rng.setstate((metadata.pop('random_version'), internal_state, metadata.pop('gauss_next')))
+    return metadata, hypotheses
@@ -0,0 +1,128 @@
+import math
+
+
+class CoolingSchedule:
+    """
+    base class of temperature schedules for simulated annealing
+    """
+
+    def start(self, temp):
+        """
+        called once with the start temperature before the first iteration
+        """
+        pass
+
+    def next_temperature(self, temp, iteration, accepted):
+        """
+        :param temp: current temperature
+        :param iteration: finished iterations
+        :param accepted: whether the move of the last iteration was accepted
+        :return: temperature of the next iteration
+        """
+        raise NotImplementedError
+
+    def get_state(self):
+        """
+        :return: json serializable state of the schedule for checkpoints
+        """
+        return {'schedule': type(self).__name__, 'attributes': dict(vars(self))}
+
+
+def restore_schedule(state):
+    """
+    recreates a schedule from the state returned by get_state
+    :param state: state dictionary
+    :return: schedule with the saved attributes
+    """
+    schedules = {schedule.__name__: schedule for schedule in CoolingSchedule.__subclasses__()}
+    if state['schedule'] not in schedules:
+        raise ValueError('unknown cooling schedule ' + state['schedule'])
+    schedule = object.__new__(schedules[state['schedule']])
+    vars(schedule).update(state['attributes'])
+    return schedule
+
+
+class LinearCooling(CoolingSchedule):
+    """
+    decreases the temperature by epsilon in each iteration
+    """
+
+    def __init__(self, epsilon):
+        self.epsilon = epsilon
+
+    def next_temperature(self, temp, iteration, accepted):
+        return temp - self.epsilon
+
+
+class GeometricCooling(CoolingSchedule):
+    """
+    multiplies the temperature by alpha in each iteration
+    """
+
+    def __init__(self, alpha):
+        if not 0 < alpha < 1:
+            raise ValueError('alpha must be between 0 and 1')
+        self.alpha = alpha
+
+    def next_temperature(self, temp, iteration, accepted):
+        return temp * self.alpha
+
+
+class LogarithmicCooling(CoolingSchedule):
+    """
+    temperature start_temp / (1 + c * log(1 + iteration)), slow but with convergence guarantees for large c, needs
+    exp((start_temp / min_temp - 1) / c) iterations to reach min_temp, so SimulatedAnnealer.run requires an iteration,
+    time or patience limit with this schedule
+    """
+
+    def __init__(self, c=1.0):
+        self.c = c
+        self.start_temp = None
+
+    def start(self, temp):
+        self.start_temp = temp
+
+    def next_temperature(self, temp, iteration, accepted):
+        return self.start_temp / (1 + self.c * math.log(1 + iteration))
+
+
+class AdaptiveCooling(CoolingSchedule):
+    """
+    steers the temperature so that the acceptance rate of each window of iterations follows a target acceptance rate,
+    the target decays geometrically from initial_acceptance to final_acceptance, afterwards the temperature drops to 0
+    """
+
+    def __init__(self, initial_acceptance=0.8, final_acceptance=0.01, decay=0.99, window=100, gain=0.5):
+        """
+        :param initial_acceptance: target acceptance rate of the first window
+        :param final_acceptance: target acceptance rate which ends the annealing
+        :param decay: factor of the target acceptance rate per window
+        :param window: iterations between two temperature adaptions
+        :param gain: exponent of the correction factor target / observed acceptance rate
+        """
+        self.initial_acceptance = initial_acceptance
+        self.final_acceptance = final_acceptance
+        self.decay = decay
+        self.window = window
+        self.gain = gain
+        self.target_acceptance = initial_acceptance
+        self.accepted = 0
+
+    def start(self, temp):
+        self.target_acceptance = self.initial_acceptance
+        self.accepted = 0
+
+    def next_temperature(self, temp, iteration, accepted):
+        if accepted:
+            self.accepted += 1
+        if iteration % self.window != 0:
+            return temp
+
+        acceptance = self.accepted / self.window
+        self.accepted = 0
+        self.target_acceptance *= self.decay
+        if self.target_acceptance < self.final_acceptance:
+            return 0.0
+        # too many accepted moves -> cool down, too few -> heat up (limited to a factor 2 per window)
+        correction = (self.target_acceptance + 1e-3) / (acceptance + 1e-3)
+        return temp * min(2.0, max(0.5, correction ** self.gain))
@@ -0,0 +1,218 @@
+import gzip
+import math
+from collections import OrderedDict
+
+import numpy as np
+
+from optimization.shared_arrays import share_array, attach_array
+
+# TSPLIB edge weight types
+EUC_2D = 'EUC_2D'
+CEIL_2D = 'CEIL_2D'
+ATT = 'ATT'
+GEO = 'GEO'
+EDGE_WEIGHT_TYPES = [EUC_2D, CEIL_2D, ATT, GEO]
+
+GEO_PI = 3.141592
+GEO_EARTH_RADIUS = 6378.388
+
+
+class CoordinateInstance:
+    """
+    traveling salesman instance which stores only the node coordinates and computes distances on demand, recently used
+    distances are kept in a bounded cache (least recently used pairs are evicted)
+    """
+
+    def __init__(self, coordinates, edge_weight_type=EUC_2D, cache_size=65536, name=None):
+        """
+        creates a new instance
+        :param coordinates: array of shape (n, 2)
+        :param edge_weight_type: TSPLIB distance function: 'EUC_2D', 'CEIL_2D', 'ATT' or 'GEO'
+        :param cache_size: maximal number of cached node pairs, 0 disables the cache
+        :param name: instance name
+        """
+        if edge_weight_type not in EDGE_WEIGHT_TYPES:
+            raise ValueError('edge weight type must be one of {}'.format(', '.join(EDGE_WEIGHT_TYPES)))
+        self.coordinates = np.ascontiguousarray(coordinates, dtype=np.float64)
+        if self.coordinates.ndim != 2 or self.coordinates.shape[1] != 2:
+            raise ValueError('coordinates must have the shape (n, 2)')
+        self.edge_weight_type = edge_weight_type
+        self.cache_size = cache_size
+        self.name = name
+        self.number_of_nodes = len(self.coordinates)
+        # GEO distances are computed on latitude / longitude in radians
+        self.geo_coordinates = self._to_geo_radians(self.coordinates) if edge_weight_type == GEO else None
+        self.cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @classmethod
+    def generate(cls, number_of_nodes, max_coordinate, edge_weight_type=EUC_2D, cache_size=65536, seed=None):
+        """
+        generates an instance with uniformly distributed random coordinates
+        :param number_of_nodes: number of nodes
+        :param max_coordinate: maximal value of both coordinates
+        :param edge_weight_type: TSPLIB distance function
+        :param cache_size: maximal number of cached node pairs
+        :param seed: seed of the random number generator
+        :return: coordinate instance
+        """
+        coordinates = np.random.default_rng(seed).random((number_of_nodes, 2)) * max_coordinate
+        return cls(coordinates, edge_weight_type, cache_size, 'random{}'.format(number_of_nodes))
+
+    @classmethod
+    def load_tsplib(cls, path, cache_size=65536):
+        """
+        loads a TSPLIB .tsp file (optionally gzip compressed) with a NODE_COORD_SECTION
+        :param path: file path
+        :param cache_size: maximal number of cached node pairs
+        :return: coordinate instance
+        """
+        open_file = gzip.open if str(path).endswith('.gz') else open
+        specification = {}
+        coordinates = None
+
+        with open_file(path, 'rt') as file:
+            lines = iter(file)
+            for line in lines:
+                line = line.strip()
+                if line == '' or line == 'EOF':
+                    continue
+                if line.startswith('NODE_COORD_SECTION'):
+                    dimension = int(specification['DIMENSION'])
+                    coordinates = np.empty((dimension, 2))
+                    for node in range(dimension):
+                        values = next(lines).split()
+                        coordinates[node] = float(values[1]), float(values[2])
+                    continue
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    specification[key.strip()] = value.strip()
+
+        if coordinates is None:
+            raise ValueError('{} has no NODE_COORD_SECTION'.format(path))
+        return cls(coordinates, specification.get('EDGE_WEIGHT_TYPE', EUC_2D), cache_size, specification.get('NAME'))
+
+    def share(self):
+        """
+        shares the coordinates with other processes without pickling them
+        :return: shared memory block (to keep open and unlink after use) and picklable handle for attach
+        """
+        shared_memory, specification = share_array(self.coordinates)
+        return shared_memory, (CoordinateInstance, (specification, self.edge_weight_type, self.cache_size, self.name))
+
+    @classmethod
+    def attach(cls, specification):
+        """
+        creates an instance on coordinates shared by share, every process gets its own distance cache
+        :param specification: specification of the handle returned by share
+        :return: coordinate instance and opened shared memory block
+        """
+        array_specification, edge_weight_type, cache_size, name = specification
+        coordinates, shared_memory = attach_array(array_specification)
+        return cls(coordinates, edge_weight_type, cache_size, name), shared_memory
+
+    @staticmethod
+    def _to_geo_radians(coordinates):
+        degrees = np.trunc(coordinates)
+        return GEO_PI * (degrees + 5.0 * (coordinates - degrees) / 3.0) / 180.0
+
+    def __len__(self):
+        return self.number_of_nodes
+
+    def __getitem__(self, node):
+        """
+        returns all distances of one node as array
+        """
+        return self.distances(node, np.arange(self.number_of_nodes))
+
+    def distance(self, first, second):
+        """
+        returns the distance between two nodes, served from the cache when possible
+        """
+        # python ints, numpy int32 node ids overflow in the key for more than 46341 nodes
+        first, second = int(first), int(second)
+        if first > second:
+            first, second = second, first
+        key = first * self.number_of_nodes + second
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache_hits += 1
+            self.cache.move_to_end(key)
+            return cached
+
+        self.cache_misses += 1
+        distance = self.compute_distance(first, second)
+        if self.cache_size > 0:
+            self.cache[key] = distance
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return distance
+
+    def compute_distance(self, first, second):
+        """
+        computes the distance between two nodes without the cache
+        """
+        if first == second:
+            return 0
+        if self.edge_weight_type == GEO:
+            first_latitude, first_longitude = self.geo_coordinates[first]
+            second_latitude, second_longitude = self.geo_coordinates[second]
+            q1 = math.cos(first_longitude - second_longitude)
+            q2 = math.cos(first_latitude - second_latitude)
+            q3 = math.cos(first_latitude + second_latitude)
+            cosine = max(-1.0, min(1.0, 0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3)))
+            return int(GEO_EARTH_RADIUS * math.acos(cosine) + 1.0)
+
+        first_x, first_y = self.coordinates[first]
+        second_x, second_y = self.coordinates[second]
+        if self.edge_weight_type == ATT:
+            exact = math.sqrt(((first_x - second_x) ** 2 + (first_y - second_y) ** 2) / 10.0)
+            rounded = int(exact + 0.5)
+            return rounded + 1 if rounded < exact else rounded
+        exact = math.hypot(first_x - second_x, first_y - second_y)
+        return math.ceil(exact) if self.edge_weight_type == CEIL_2D else int(exact + 0.5)
+
+    def distances(self, first, second):
+        """
+        computes the distances between the node arrays first and second element wise (with numpy broadcasting)
+        """
+        first = np.asarray(first)
+        second = np.asarray(second)
+        if self.edge_weight_type == GEO:
+            first_coordinates = self.geo_coordinates[first]
+            second_coordinates = self.geo_coordinates[second]
+            q1 = np.cos(first_coordinates[..., 1] - second_coordinates[..., 1])
+            q2 = np.cos(first_coordinates[..., 0] - second_coordinates[..., 0])
+            q3 = np.cos(first_coordinates[..., 0] + second_coordinates[..., 0])
+            cosine = np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)
+            distances = (GEO_EARTH_RADIUS * np.arccos(cosine) + 1.0).astype(np.int64)
+            return np.where(first == second, 0, distances)
+
+        difference = self.coordinates[first] - self.coordinates[second]
+        squared = np.einsum('...i,...i->...', difference, difference)
+        if self.edge_weight_type == ATT:
+            exact = np.sqrt(squared / 10.0)
+            rounded = (exact + 0.5).astype(np.int64)
+            return rounded + (rounded < exact)
+        exact = np.sqrt(squared)
+        if self.edge_weight_type == CEIL_2D:
+            return np.ceil(exact).astype(np.int64)
+        return (exact + 0.5).astype(np.int64)
+
+    def tour_length(self, hypothesis):
+        """
+        sums the distances along the hypothesis
+        :param hypothesis: sequence of nodes
+        :return: length as python number
+        """
+        nodes = np.asarray(hypothesis)
+        return int(self.distances(nodes[:-1], nodes[1:]).sum())
+
+    def clear_cache(self):
+        """
+        empties the distance cache and resets its counters
+        """
+        self.cache.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
@@ -0,0 +1,161 @@
+import numpy as np
+
+from optimization.shared_arrays import share_array, attach_array
+
+
+class DistanceMatrix:
+    """
+    symmetric distance matrix backed by one contiguous numpy array, either as full n x n matrix or packed as upper
+    triangle (including the diagonal) with n * (n + 1) / 2 entries
+    """
+
+    def __init__(self, data):
+        """
+        creates a distance matrix from an existing array
+        :param data: two dimensional n x n array (full storage) or one dimensional array of length n * (n + 1) / 2
+                     (packed storage)
+        """
+        self.data = data
+        self.packed = data.ndim == 1
+        if self.packed:
+            self.number_of_nodes = int((np.sqrt(8 * len(data) + 1) - 1) // 2)
+            if self.number_of_nodes * (self.number_of_nodes + 1) // 2 != len(data):
+                raise ValueError('packed distance data must have n * (n + 1) / 2 entries')
+        else:
+            if data.ndim != 2 or data.shape[0] != data.shape[1]:
+                raise ValueError('distance data must be a square matrix')
+            self.number_of_nodes = data.shape[0]
+
+    @classmethod
+    def generate(cls, number_of_nodes, max_distance, dtype=np.int32, packed=False, seed=None):
+        """
+        generates a symmetric matrix with random distances between 1 and max_distance and zeros on the diagonal
+        :param number_of_nodes: number of nodes
+        :param max_distance: maximal distance between two nodes
+        :param dtype: numpy dtype of the entries (f.e. int16, int32 or float32)
+        :param packed: store only the upper triangle
+        :param seed: seed of the random number generator
+        :return: distance matrix
+        """
+        dtype = np.dtype(dtype)
+        rng = np.random.default_rng(seed)
+        if packed:
+            data = cls._random_values(rng, number_of_nodes * (number_of_nodes + 1) // 2, max_distance, dtype)
+            diagonal = np.arange(number_of_nodes)
+            data[cls._packed_index(diagonal, diagonal, number_of_nodes)] = 0
+        else:
+            data = np.triu(cls._random_values(rng, (number_of_nodes, number_of_nodes), max_distance, dtype), 1)
+            data += data.T
+        return cls(data)
+
+    @classmethod
+    def from_list(cls, distance_matrix, dtype=None, packed=False):
+        """
+        converts a nested list distance matrix
+        :param distance_matrix: two dimensional list
+        :param dtype: numpy dtype of the entries, inferred from the values by default so float distances are kept
+        :param packed: store only the upper triangle
+        :return: distance matrix
+        """
+        data = np.asarray(distance_matrix, dtype=dtype)
+        if packed:
+            data = data[np.triu_indices(len(data))]
+        return cls(np.ascontiguousarray(data))
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        loads a distance matrix saved with save
+        :param path: path of the .npy file
+        :param mmap: map the file read only into memory instead of reading it completely
+        :return: distance matrix
+        """
+        return cls(np.load(path, mmap_mode='r' if mmap else None))
+
+    def save(self, path):
+        """
+        saves the distance matrix as .npy file which can be memory mapped by load
+        :param path: file path
+        """
+        np.save(path, self.data)
+
+    def share(self):
+        """
+        shares the distances with other processes without pickling them
+        :return: shared memory block (to keep open and unlink after use, None for memory mapped files) and picklable
+                 handle for attach
+        """
+        shared_memory, specification = share_array(self.data)
+        return shared_memory, (DistanceMatrix, specification)
+
+    @classmethod
+    def attach(cls, specification):
+        """
+        creates a distance matrix on distances shared by share
+        :param specification: array specification of the handle returned by share
+        :return: distance matrix and opened shared memory block
+        """
+        data, shared_memory = attach_array(specification)
+        return cls(data), shared_memory
+
+    @staticmethod
+    def _random_values(rng, size, max_distance, dtype):
+        if dtype.kind == 'f':
+            return (rng.random(size, dtype=np.float32 if dtype == np.float32 else np.float64)
+                    * (max_distance - 1) + 1).astype(dtype, copy=False)
+        if np.iinfo(dtype).max < max_distance:
+            raise ValueError('max_distance {} does not fit into {}'.format(max_distance, dtype))
+        return rng.integers(1, max_distance, size=size, dtype=dtype, endpoint=True)
+
+    @staticmethod
+    def _packed_index(first, second, number_of_nodes):
+        """
+        returns the position of (first, second) in the packed upper triangle, works element wise on arrays
+        """
+        row = np.minimum(first, second)
+        column = np.maximum(first, second)
+        return row * number_of_nodes - row * (row - 1) // 2 + column - row
+
+    def __len__(self):
+        return self.number_of_nodes
+
+    def __getitem__(self, node):
+        """
+        returns all distances of one node as array
+        """
+        if not self.packed:
+            return self.data[node]
+        return self.data[self._packed_index(node, np.arange(self.number_of_nodes), self.number_of_nodes)]
+
+    def __iter__(self):
+        for node in range(self.number_of_nodes):
+            yield self[node]
+
+    def distance(self, first, second):
+        """
+        returns the distance between two nodes as python number
+        """
+        if self.packed:
+            if first > second:
+                first, second = second, first
+            return self.data.item(first * self.number_of_nodes - first * (first - 1) // 2 + second - first)
+        return self.data.item(first, second)
+
+    def distances(self, first, second):
+        """
+        returns the distances between the node arrays first and second element wise (with numpy broadcasting)
+        """
+        if self.packed:
+            return self.data[self._packed_index(np.asarray(first, dtype=np.int64), np.asarray(second, dtype=np.int64),
+                                                self.number_of_nodes)]
+        return self.data[first, second]
+
+    def tour_length(self, hypothesis):
+        """
+        sums the distances along the hypothesis
+        :param hypothesis: sequence of nodes
+        :return: length as python number
+        """
+        nodes = np.asarray(hypothesis)
+        return self.distances(nodes[:-1], nodes[1:]).sum(dtype=np.float64 if self.data.dtype.kind == 'f'
+                                                         else np.int64).item()
@@ -1,48 +1,276 @@
+import itertools
+
+from optimization.checkpoint import CHECKPOINT_INTERVAL, load_checkpoint, save_checkpoint
+from optimization.stopping_criteria import *
+from telemetry import Telemetry
 
 
 class HillClimber:
 
-    def __init__(self, fitness, move_one_step_at_random, build_start_hypothesis):
+    def __init__(self, fitness, move_one_step_at_random, build_start_hypothesis, fitness_delta=None, undo_move=None,
+                 observers=None, sample_interval=1000, checkpoint_path=None, checkpoint_interval=CHECKPOINT_INTERVAL):
         """
         creates an hill climber algorithm
         :param fitness: function
-        :param move_one_step_at_random: function
+        :param move_one_step_at_random: function, returns the new hypothesis (f.e. move_one_step_at_random) or - if
+                                        fitness_delta and undo_move are given - changes the hypothesis in place and
+                                        returns the performed move (f.e. random_swap)
         :param build_start_hypothesis: function
+        :param fitness_delta: optional function (hypothesis, move, data) -> fitness change of the applied move
+        :param undo_move: optional function (hypothesis, move) which reverts the move in place
+        :param observers: list of telemetry observers (f.e. PrintObserver), silent by default
+        :param sample_interval: iterations between two progress notifications of the observers
+        :param checkpoint_path: optional file the state of run is saved to every checkpoint_interval iterations and
+                                at its end, hypotheses must be sequences of numbers, moves have to use the random
+                                module
+        :param checkpoint_interval: iterations between two checkpoints
         """
         self.fitness = fitness
         self.move_one_step_at_random = move_one_step_at_random
         self.build_start_hypothesis = build_start_hypothesis
+        self.fitness_delta = fitness_delta
+        self.undo_move = undo_move
+        self.telemetry = Telemetry(observers, sample_interval)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
         self.data = None
         self.optimal_hypothesis = None
         self.iterations_needed = None
+        self.statistics = None
+        self.stop_reason = None
 
-    def run(self, data, iterations):
+    def run(self, data, iterations, time_budget=None, deadline=None, patience=None):
         """
         runs the hill climbing algorithm
+        :param data: data to optimize (f.e. distance matrix)
+        :param iterations: maximal number of iterations (including the start hypothesis), None for no limit
+        :param time_budget: optional seconds the run may take
+        :param deadline: optional time.time() timestamp the run has to be finished by
+        :param patience: optional number of iterations without improvement after which the run stops
         :return: optimal hypothesis  and number of iterations
         """
+        if iterations is None and time_budget is None and deadline is None and patience is None:
+            raise ValueError('at least one of iterations, time_budget, deadline or patience is needed')
         self.data = data
-        print('-' * 30 + 'Hill Climbing' + '-' * 30)
         hypothesis = self.build_start_hypothesis(data)
-        print('Starting hypothesis:', str(hypothesis))
         last_fitness = self.fitness(hypothesis, data)
-        print('Starting fitness:', last_fitness)
-        print('-' * 40)
-        saved_hypothesis = None
+        self.telemetry.start(self, 'Hill Climbing', last_fitness)
+        state = {
+            'iteration': 0,
+            'accepted': 0,
+            'last_improvement': 0,
+            'last_fitness': last_fitness,
+            'iterations': iterations,
+            'patience': patience,
+            'stop_reason': None
+        }
+        return self.climb(data, hypothesis, state, get_end_time(time_budget, deadline))
+
+    def resume(self, data, iterations=None, time_budget=None, deadline=None, checkpoint_path=None):
+        """
+        continues a run from its checkpoint with the saved hypothesis, counters and state of the random module, a run
+        continued from its last periodic checkpoint proceeds exactly as the interrupted run
+        :param data: data to optimize, the same as in the checkpointed run
+        :param iterations: optional new maximal number of iterations, defaults to the one of the checkpointed run
+        :param time_budget: optional seconds the resumed run may take
+        :param deadline: optional time.time() timestamp the resumed run has to be finished by
+        :param checkpoint_path: checkpoint to resume from, defaults to the checkpoint path of the hill climber
+        :return: optimal hypothesis and number of iterations (including the ones before the checkpoint)
+        """
+        state, hypotheses = load_checkpoint(checkpoint_path or self.checkpoint_path)
+        if iterations is not None:
+            state['iterations'] = iterations
+        self.data = data
+        hypothesis = hypotheses['hypothesis']
+        if state['stop_reason'] == STAGNATION:
+            self.stop_reason = STAGNATION
+            self.optimal_hypothesis = hypothesis
+            self.iterations_needed = state['iteration'] + 1
+            return hypothesis, state['iteration'] + 1
+
+        self.telemetry.start(self, 'Hill Climbing (resumed)', state['last_fitness'], start_iteration=state['iteration'])
+        return self.climb(data, hypothesis, state, get_end_time(time_budget, deadline))
+
+    def climb(self, data, hypothesis, state, end_time):
+        """
+        the climbing loop of run and resume
+        :param data: data to optimize
+        :param hypothesis: hypothesis to start with
+        :param state: dictionary of counters, fitness and stopping parameters, saved as metadata of the checkpoints
+        :param end_time: end time from get_end_time
+        :return: optimal hypothesis and number of iterations
+        """
+        iterations = state['iterations']
+        start = state['iteration'] + 1
+        iteration_range = itertools.count(start) if iterations is None else range(start, iterations)
+
+        if self.fitness_delta is not None and self.undo_move is not None:
+            hypothesis, last_fitness, accepted, i = self.run_incremental(hypothesis, data, state, iteration_range,
+                                                                         end_time)
+        else:
+            hypothesis, last_fitness, accepted, i = self.run_with_copies(hypothesis, data, state, iteration_range,
+                                                                         end_time)
 
-        for i in range(1, iterations):
+        if self.checkpoint_path is not None:
+            state.update(iteration=i, accepted=accepted, last_fitness=last_fitness, stop_reason=self.stop_reason)
+            self.write_checkpoint(hypothesis, state)
+        self.statistics = self.telemetry.finish(i, accepted, i - accepted, last_fitness)
+        self.optimal_hypothesis = hypothesis
+        self.iterations_needed = i + 1
+        return hypothesis, i + 1
+
+    def run_with_copies(self, hypothesis, data, state, iteration_range, end_time):
+        """
+        climbs by copying the hypothesis before each move and evaluating the full fitness afterwards
+        :return: best hypothesis, its fitness, number of accepted moves and number of moves
+        """
+        telemetry = self.telemetry
+        last_fitness = state['last_fitness']
+        accepted = state['accepted']
+        last_improvement = state['last_improvement']
+        patience = state['patience']
+        i = state['iteration']
+        next_sample = (i // telemetry.sample_interval + 1) * telemetry.sample_interval
+        next_checkpoint = (i // self.checkpoint_interval + 1) * self.checkpoint_interval \
+            if self.checkpoint_path is not None else -1
+        bounded = end_time is not None or patience is not None
+        self.stop_reason = ITERATIONS
+
+        for i in iteration_range:
 
             saved_hypothesis = hypothesis.copy()
             hypothesis = self.move_one_step_at_random(hypothesis)
-            if self.fitness(hypothesis, data) > last_fitness:
-                last_fitness = self.fitness(hypothesis, data)
-                print('New fitness:', last_fitness)
+            new_fitness = self.fitness(hypothesis, data)
+            if new_fitness > last_fitness:
+                last_fitness = new_fitness
+                accepted += 1
+                last_improvement = i
+                telemetry.improvement(i, last_fitness)
             else:
                 hypothesis = saved_hypothesis
 
+            if i == next_sample:
+                telemetry.sample(i, accepted, i - accepted, last_fitness)
+                next_sample += telemetry.sample_interval
+            if i == next_checkpoint:
+                state.update(iteration=i, accepted=accepted, last_improvement=last_improvement,
+                             last_fitness=last_fitness)
+                self.write_checkpoint(hypothesis, state)
+                next_checkpoint += self.checkpoint_interval
+            if bounded and self.should_stop(i, last_improvement, end_time, patience):
+                break
+
+        state['last_improvement'] = last_improvement
+        return hypothesis, last_fitness, accepted, i
+
+    def run_incremental(self, hypothesis, data, state, iteration_range, end_time):
+        """
+        climbs by changing the hypothesis in place, evaluating only the fitness change of each move and undoing
+        rejected moves
+        :return: best hypothesis, its fitness, number of accepted moves and number of moves
+        """
+        telemetry = self.telemetry
+        last_fitness = state['last_fitness']
+        accepted = state['accepted']
+        last_improvement = state['last_improvement']
+        patience = state['patience']
+        i = state['iteration']
+        next_sample = (i // telemetry.sample_interval + 1) * telemetry.sample_interval
+        next_checkpoint = (i // self.checkpoint_interval + 1) * self.checkpoint_interval \
+            if self.checkpoint_path is not None else -1
+        bounded = end_time is not None or patience is not None
+        self.stop_reason = ITERATIONS
+
+        for i in iteration_range:
+
+            move = self.move_one_step_at_random(hypothesis)
+            delta = self.fitness_delta(hypothesis, move, data)
+            if delta > 0:
+                last_fitness += delta
+                accepted += 1
+                last_improvement = i
+                telemetry.improvement(i, last_fitness)
+            else:
+                self.undo_move(hypothesis, move)
+
+            if i == next_sample:
+                telemetry.sample(i, accepted, i - accepted, last_fitness)
+                next_sample += telemetry.sample_interval
+            if i == next_checkpoint:
+                state.update(iteration=i, accepted=accepted, last_improvement=last_improvement,
+                             last_fitness=last_fitness)
+                self.write_checkpoint(hypothesis, state)
+                next_checkpoint += self.checkpoint_interval
+            if bounded and self.should_stop(i, last_improvement, end_time, patience):
+                break
+
+        state['last_improvement'] = last_improvement
+        return hypothesis, last_fitness, accepted, i
+
+    def write_checkpoint(self, hypothesis, state):
+        """
+        saves the state of the run to the checkpoint path
+        """
+        save_checkpoint(self.checkpoint_path, state, {'hypothesis': hypothesis})
+
+    def should_stop(self, i, last_improvement, end_time, patience):
+        """
+        checks the time budget and the stagnation window and sets self.stop_reason
+        :return: True if the run has to stop
+        """
+        if patience is not None and i - last_improvement >= patience:
+            self.stop_reason = STAGNATION
+            return True
+        if time_is_up(i, end_time):
+            self.stop_reason = TIME
+            return True
+        return False
+
+    def run_local_search(self, data, find_improving_move, apply_move, max_steps=None, time_budget=None,
+                         deadline=None):
+        """
+        runs the hill climbing algorithm with a deterministic neighbourhood search: in each step the improving move
+        returned by find_improving_move (f.e. the steepest or first improving 2-opt move) is applied until a local
+        optimum is reached
+        :param data: data to optimize (f.e. distance matrix)
+        :param find_improving_move: function (hypothesis, data) -> (move, fitness delta), move is None in an optimum
+        :param apply_move: function (hypothesis, move) which applies the move in place
+        :param max_steps: optional maximal number of applied moves
+        :param time_budget: optional seconds the run may take, checked before each search for a move
+        :param deadline: optional time.time() timestamp the run has to be finished by
+        :return: optimal hypothesis and number of applied moves
+        """
+        self.data = data
+        hypothesis = self.build_start_hypothesis(data)
+        last_fitness = self.fitness(hypothesis, data)
+        telemetry = self.telemetry
+        telemetry.start(self, 'Hill Climbing (local search)', last_fitness)
+        next_sample = telemetry.sample_interval
+        end_time = get_end_time(time_budget, deadline)
+        self.stop_reason = ITERATIONS
+        steps = 0
+
+        while max_steps is None or steps < max_steps:
+            if time_is_up(0, end_time):
+                self.stop_reason = TIME
+                break
+            move, delta = find_improving_move(hypothesis, data)
+            if move is None:
+                self.stop_reason = LOCAL_OPTIMUM
+                break
+            apply_move(hypothesis, move)
+            last_fitness += delta
+            steps += 1
+            telemetry.improvement(steps, last_fitness)
+
+            if steps == next_sample:
+                telemetry.sample(steps, steps, 0, last_fitness)
+                next_sample += telemetry.sample_interval
+
+        self.statistics = telemetry.finish(steps, steps, 0, last_fitness)
         self.optimal_hypothesis = hypothesis
-        self.iterations_needed = iterations
-        return hypothesis, iterations
+        self.iterations_needed = steps
+        return hypothesis, steps
 
     def print_result(self):
         print('-' * 20 + 'Hill Climbing' + '-' * 20)
@@ -0,0 +1,95 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from optimization.distance_matrix import DistanceMatrix
+from optimization.hill_climbing import HillClimber
+from optimization.shared_arrays import attach_worker_instance, get_worker_instance
+from optimization.tsp_methods import *
+
+# start strategies
+RANDOM_START = 'random'
+NEAREST_NEIGHBOUR_START = 'nearest_neighbour'
+# climbing methods
+SWAP = 'swap'
+TWO_OPT = 'two_opt'
+
+
+def run_multi_start(distance_matrix, starts, start_strategy=RANDOM_START, method=TWO_OPT, iterations=10000,
+                    max_workers=None, seed=None):
+    """
+    runs independent hill climbs from different start hypotheses in a process pool, the instance is handed to the
+    workers once through shared memory (or its memory mapped file) instead of being pickled for each climb
+    :param distance_matrix: DistanceMatrix, CoordinateInstance or two dimensional list
+    :param starts: number of climbs
+    :param start_strategy: 'random' (random permutation) or 'nearest_neighbour' (greedy tour from a random node)
+    :param method: 'swap' (random swaps with iterations) or 'two_opt' (steepest 2-opt until a local optimum)
+    :param iterations: iterations of each swap climb
+    :param max_workers: number of processes, defaults to the number of cpus
+    :param seed: base seed, climb i uses seed + i
+    :return: best hypothesis, its fitness and a list with statistics of every climb
+    """
+    if start_strategy not in [RANDOM_START, NEAREST_NEIGHBOUR_START]:
+        raise ValueError('start strategy must be random or nearest_neighbour')
+    if method not in [SWAP, TWO_OPT]:
+        raise ValueError('method must be swap or two_opt')
+    if not isinstance(distance_matrix, INSTANCE_TYPES):
+        distance_matrix = DistanceMatrix.from_list(distance_matrix)
+
+    shared_memory, handle = distance_matrix.share()
+    try:
+        with ProcessPoolExecutor(max_workers or os.cpu_count(), initializer=attach_worker_instance,
+                                 initargs=(handle,)) as executor:
+            futures = [executor.submit(_climb, start_index, start_strategy, method, iterations,
+                                       None if seed is None else seed + start_index)
+                       for start_index in range(starts)]
+            results = [future.result() for future in futures]
+    finally:
+        if shared_memory is not None:
+            shared_memory.close()
+            shared_memory.unlink()
+
+    best_hypothesis, best_fitness, statistics = max(results, key=lambda result: result[1])
+    return best_hypothesis, best_fitness, [result[2] for result in results]
+
+
+def _climb(start_index, start_strategy, method, iterations, seed):
+    """
+    runs one hill climb on the instance of the worker process
+    :return: hypothesis, fitness and statistics of the climb
+    """
+    instance = get_worker_instance()
+    rng = random.Random(seed)
+    if start_strategy == RANDOM_START:
+        start_hypothesis = build_random_start_hypothesis(instance, rng)
+    else:
+        start_hypothesis = build_nearest_neighbour_hypothesis(instance, rng.randrange(len(instance)))
+    start_fitness = fitness(start_hypothesis, instance)
+    start_time = time.perf_counter()
+
+    if method == SWAP:
+        def move_one_step(hypothesis):
+            return random_swap(hypothesis, rng)
+
+        hill_climber = HillClimber(fitness, move_one_step, lambda data: start_hypothesis, swap_fitness_delta,
+                                   undo_swap)
+        hypothesis, steps = hill_climber.run(instance, iterations)
+    else:
+        hill_climber = HillClimber(fitness, None, lambda data: start_hypothesis)
+        hypothesis, steps = hill_climber.run_local_search(instance, steepest_two_opt_move, reverse_segment)
+
+    hypothesis_fitness = fitness(hypothesis, instance)
+    statistics = {
+        'start_index': start_index,
+        'start_strategy': start_strategy,
+        'method': method,
+        'seed': seed,
+        'start_fitness': start_fitness,
+        'fitness': hypothesis_fitness,
+        'steps': steps,
+        'seconds': time.perf_counter() - start_time,
+        'iterations_per_second': hill_climber.statistics.iterations_per_second(),
+        'process': os.getpid()
+    }
+    return hypothesis, hypothesis_fitness, statistics
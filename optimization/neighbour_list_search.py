@@ -0,0 +1,367 @@
+from collections import deque
+
+import numpy as np
+
+from optimization.coordinate_instance import CoordinateInstance, GEO
+from optimization.tsp_methods import MIN_IMPROVEMENT, get_distance_function, get_distances_function, reverse_segment
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+# moves
+TWO_OPT_MOVE = 'two_opt'
+OR_OPT_MOVE = 'or_opt'
+# longest segment moved by or-opt
+MAX_SEGMENT_LENGTH = 3
+# number of distances computed at once when the neighbours are searched without kd-tree
+NEIGHBOUR_BLOCK_SIZE = 2 ** 20
+# average number of nodes per cell of the grid index used without scipy
+GRID_NODES_PER_CELL = 2
+
+
+def nearest_neighbours(distance_matrix, neighbours):
+    """
+    returns the nearest neighbours of every node, sorted by distance, coordinate instances use a kd-tree if scipy is
+    installed and a grid index otherwise, all other instances are searched block wise
+    :param distance_matrix: DistanceMatrix, CoordinateInstance or two dimensional list
+    :param neighbours: number of neighbours per node
+    :return: (n, neighbours) array of nodes
+    """
+    number_of_nodes = len(distance_matrix)
+    neighbours = min(neighbours, number_of_nodes - 1)
+    nodes = np.arange(number_of_nodes)
+
+    if isinstance(distance_matrix, CoordinateInstance) and distance_matrix.edge_weight_type != GEO:
+        # all supported planar distances are monotone in the euclidean distance
+        if cKDTree is None:
+            return grid_nearest_neighbours(distance_matrix.coordinates, neighbours)
+        candidates = cKDTree(distance_matrix.coordinates).query(distance_matrix.coordinates, neighbours + 1)[1]
+        # the node itself is usually the first candidate, but not always for duplicate coordinates
+        order = np.argsort(candidates == nodes[:, np.newaxis], axis=1, kind='stable')
+        return np.take_along_axis(candidates, order, axis=1)[:, :neighbours]
+
+    distances = get_distances_function(distance_matrix)
+    neighbour_lists = np.empty((number_of_nodes, neighbours), dtype=np.int64)
+    rows = max(1, NEIGHBOUR_BLOCK_SIZE // number_of_nodes)
+    for first_row in range(0, number_of_nodes, rows):
+        block = nodes[first_row:first_row + rows]
+        block_distances = distances(block[:, np.newaxis], nodes).astype(np.float64)
+        block_distances[np.arange(len(block)), block] = np.inf
+        candidates = np.argpartition(block_distances, neighbours - 1, axis=1)[:, :neighbours]
+        order = np.argsort(np.take_along_axis(block_distances, candidates, axis=1), axis=1, kind='stable')
+        neighbour_lists[block] = np.take_along_axis(candidates, order, axis=1)
+    return neighbour_lists
+
+
+def grid_nearest_neighbours(coordinates, neighbours):
+    """
+    returns the nearest neighbours (euclidean distance) of every point with a uniform grid of square cells: the
+    points of the cells within r cells of a point are its candidates, a point whose k-th nearest candidate is not
+    farther than r cell sizes has its exact neighbours (every point outside these cells is farther), the others are
+    searched again with r + 1
+    :param coordinates: (n, 2) array
+    :param neighbours: number of neighbours per point, less than n
+    :return: (n, neighbours) array of points
+    """
+    number_of_points = len(coordinates)
+    minimum = coordinates.min(axis=0)
+    span = max(float((coordinates.max(axis=0) - minimum).max()), np.finfo(np.float64).tiny)
+    cells_per_axis = max(1, int(np.sqrt(number_of_points / GRID_NODES_PER_CELL)))
+    cell_size = span / cells_per_axis
+    cells = np.minimum(((coordinates - minimum) / cell_size).astype(np.int64), cells_per_axis - 1)
+    cell_ids = cells[:, 0] * cells_per_axis + cells[:, 1]
+    # points sorted by cell, the points of cell c are sorted_points[cell_starts[c]:cell_starts[c] + cell_counts[c]]
+    sorted_points = np.argsort(cell_ids, kind='stable')
+    cell_counts = np.bincount(cell_ids, minlength=cells_per_axis ** 2)
+    cell_starts = np.cumsum(cell_counts) - cell_counts
+
+    neighbour_lists = np.empty((number_of_points, neighbours), dtype=np.int64)
+    pending = sorted_points
+    radius = 1
+    while len(pending) > 0:
+        offsets = np.arange(-radius, radius + 1)
+        neighbour_x = cells[pending, 0][:, np.newaxis] + np.repeat(offsets, len(offsets))
+        neighbour_y = cells[pending, 1][:, np.newaxis] + np.tile(offsets, len(offsets))
+        inside = (neighbour_x >= 0) & (neighbour_x < cells_per_axis) & (neighbour_y >= 0) \
+            & (neighbour_y < cells_per_axis)
+        neighbour_cells = np.where(inside, neighbour_x * cells_per_axis + neighbour_y, 0)
+        counts = np.where(inside, cell_counts[neighbour_cells], 0)
+        totals = counts.sum(axis=1)
+        rows = max(1, NEIGHBOUR_BLOCK_SIZE // max(1, int(totals.max())))
+        # the grid covers every cell, so all remaining points are decided
+        complete = radius >= cells_per_axis
+        still_pending = []
+
+        for first_row in range(0, len(pending), rows):
+            block = slice(first_row, first_row + rows)
+            block_points = pending[block]
+            block_counts = counts[block].ravel()
+            width = int(totals[block].max())
+            # candidate matrix: row i lists the points of all cells around point i, padded with -1
+            row_of_entry = np.repeat(np.repeat(np.arange(len(block_points)), counts.shape[1]), block_counts)
+            entry_offsets = np.cumsum(block_counts) - block_counts
+            position_in_cell = np.arange(block_counts.sum()) - np.repeat(entry_offsets, block_counts)
+            row_offsets = np.cumsum(totals[block]) - totals[block]
+            column = np.arange(len(row_of_entry)) - row_offsets[row_of_entry]
+            candidates = np.full((len(block_points), width), -1, dtype=np.int64)
+            candidates[row_of_entry, column] = sorted_points[
+                np.repeat(cell_starts[neighbour_cells[block].ravel()], block_counts) + position_in_cell]
+
+            differences = coordinates[np.maximum(candidates, 0)] - coordinates[block_points][:, np.newaxis]
+            distances = np.hypot(differences[..., 0], differences[..., 1])
+            distances[(candidates < 0) | (candidates == block_points[:, np.newaxis])] = np.inf
+            if width < neighbours:
+                still_pending.append(block_points)
+                continue
+            nearest = np.argpartition(distances, neighbours - 1, axis=1)[:, :neighbours]
+            nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+            order = np.argsort(nearest_distances, axis=1, kind='stable')
+            nearest = np.take_along_axis(nearest, order, axis=1)
+            kth_distance = np.take_along_axis(nearest_distances, order[:, -1:], axis=1)[:, 0]
+
+            decided = np.full(len(block_points), True) if complete else kth_distance <= radius * cell_size
+            neighbour_lists[block_points[decided]] = np.take_along_axis(candidates[decided], nearest[decided], axis=1)
+            still_pending.append(block_points[~decided])
+
+        pending = np.concatenate(still_pending)
+        radius += 1
+    return neighbour_lists
+
+
+class NeighbourListSearch:
+    """
+    first improvement local search with 2-opt and or-opt moves which only connects nodes to their nearest neighbours,
+    don't look bits keep nodes whose surroundings did not change since their last unsuccessful search out of the queue
+    used with HillClimber.run_local_search(data, search.find_improving_move, search.apply_move), the hypothesis has to
+    be a list
+    """
+
+    def __init__(self, distance_matrix, neighbours=8, or_opt=True):
+        """
+        precomputes the neighbour lists of an instance
+        :param distance_matrix: DistanceMatrix, CoordinateInstance or two dimensional list
+        :param neighbours: number of nearest neighbours per node
+        :param or_opt: also try to move segments of up to MAX_SEGMENT_LENGTH nodes
+        """
+        self.distance = get_distance_function(distance_matrix)
+        self.neighbour_lists = nearest_neighbours(distance_matrix, neighbours).tolist()
+        self.or_opt = or_opt
+        self.hypothesis = None
+        self.positions = None
+        self.queue = None
+        self.queued = None
+
+    def start(self, hypothesis):
+        """
+        binds the search to a hypothesis and puts every node into the queue
+        :param hypothesis: hypothesis as list
+        """
+        self.hypothesis = hypothesis
+        self.positions = [0] * len(hypothesis)
+        for position, node in enumerate(hypothesis):
+            self.positions[node] = position
+        self.queue = deque(hypothesis)
+        self.queued = [True] * len(hypothesis)
+
+    def find_improving_move(self, hypothesis, data=None):
+        """
+        searches the queued nodes for an improving move, nodes without one keep their don't look bit
+        :param hypothesis: hypothesis as list
+        :param data: unused, the distances are bound on creation
+        :return: move and its fitness delta, (None, 0) in a local optimum
+        """
+        if hypothesis is not self.hypothesis:
+            self.start(hypothesis)
+
+        while self.queue:
+            node = self.queue.popleft()
+            self.queued[node] = False
+            move, delta = self.find_two_opt_move(node)
+            if move is None and self.or_opt:
+                move, delta = self.find_or_opt_move(node)
+            if move is not None:
+                return move, delta
+
+        return None, 0
+
+    def find_two_opt_move(self, node):
+        """
+        searches a segment reversal which connects node with one of its neighbours
+        :return: move (TWO_OPT_MOVE, i, j) reversing positions i..j and its fitness delta or (None, 0)
+        """
+        distance = self.distance
+        hypothesis = self.hypothesis
+        positions = self.positions
+        last = len(hypothesis) - 1
+        i = positions[node]
+
+        # replace the edge to the successor of node
+        if i < last:
+            successor = hypothesis[i + 1]
+            successor_distance = distance(node, successor)
+            for neighbour in self.neighbour_lists[node]:
+                neighbour_distance = distance(node, neighbour)
+                if neighbour_distance >= successor_distance:
+                    break
+                j = positions[neighbour]
+                if j > i + 1:
+                    # reverse i + 1..j: (node, successor), (neighbour, next) -> (node, neighbour), (successor, next)
+                    delta = successor_distance - neighbour_distance
+                    if j < last:
+                        delta += distance(neighbour, hypothesis[j + 1]) - distance(successor, hypothesis[j + 1])
+                    move = (TWO_OPT_MOVE, i + 1, j)
+                elif j < i:
+                    # reverse j + 1..i: (neighbour, next), (node, successor) -> (neighbour, node), (next, successor)
+                    following = hypothesis[j + 1]
+                    delta = successor_distance - neighbour_distance + distance(neighbour, following) \
+                        - distance(following, successor)
+                    move = (TWO_OPT_MOVE, j + 1, i)
+                else:
+                    continue
+                if delta > MIN_IMPROVEMENT:
+                    return move, delta
+
+        # replace the edge to the predecessor of node
+        if i > 0:
+            predecessor = hypothesis[i - 1]
+            predecessor_distance = distance(predecessor, node)
+            for neighbour in self.neighbour_lists[node]:
+                neighbour_distance = distance(node, neighbour)
+                if neighbour_distance >= predecessor_distance:
+                    break
+                j = positions[neighbour]
+                if j < i - 1:
+                    # reverse j..i - 1: (previous, neighbour), (predecessor, node) -> (previous, predecessor),
+                    # (neighbour, node)
+                    delta = predecessor_distance - neighbour_distance
+                    if j > 0:
+                        delta += distance(hypothesis[j - 1], neighbour) - distance(hypothesis[j - 1], predecessor)
+                    move = (TWO_OPT_MOVE, j, i - 1)
+                elif j > i:
+                    # reverse i..j - 1: (predecessor, node), (previous, neighbour) -> (predecessor, previous),
+                    # (node, neighbour)
+                    previous = hypothesis[j - 1]
+                    delta = predecessor_distance - neighbour_distance + distance(previous, neighbour) \
+                        - distance(predecessor, previous)
+                    move = (TWO_OPT_MOVE, i, j - 1)
+                else:
+                    continue
+                if delta > MIN_IMPROVEMENT:
+                    return move, delta
+
+        return None, 0
+
+    def find_or_opt_move(self, node):
+        """
+        searches a move of a segment of up to MAX_SEGMENT_LENGTH nodes starting or ending at node next to one of the
+        neighbours of node
+        :return: move (OR_OPT_MOVE, i, length, left node or None, reversed) which inserts the segment at positions
+                 i..i + length - 1 after left node (at the start for None) and its fitness delta or (None, 0)
+        """
+        distance = self.distance
+        hypothesis = self.hypothesis
+        positions = self.positions
+        last = len(hypothesis) - 1
+        position = positions[node]
+
+        for length in range(1, MAX_SEGMENT_LENGTH + 1):
+            for i in {position, position - length + 1}:
+                end = i + length - 1
+                if i < 0 or end > last or end - i >= last:
+                    continue
+                first = hypothesis[i]
+                segment_last = hypothesis[end]
+
+                # gain of cutting the segment out and closing the gap
+                removal_gain = 0
+                if i > 0:
+                    removal_gain += distance(hypothesis[i - 1], first)
+                if end < last:
+                    removal_gain += distance(segment_last, hypothesis[end + 1])
+                if 0 < i and end < last:
+                    removal_gain -= distance(hypothesis[i - 1], hypothesis[end + 1])
+                if removal_gain <= MIN_IMPROVEMENT:
+                    continue
+
+                # node stays at the end of the segment which touches the neighbour
+                other = segment_last if node == first else first
+                for neighbour in self.neighbour_lists[node]:
+                    j = positions[neighbour]
+                    if i <= j <= end:
+                        continue
+                    neighbour_distance = distance(node, neighbour)
+                    if neighbour_distance >= removal_gain:
+                        break
+
+                    # insert after the neighbour: neighbour, node ... other, following
+                    if j + 1 < i or j > end:
+                        insertion_cost = neighbour_distance
+                        if j < last:
+                            following = hypothesis[j + 1]
+                            insertion_cost += distance(other, following) - distance(neighbour, following)
+                        if removal_gain - insertion_cost > MIN_IMPROVEMENT:
+                            return (OR_OPT_MOVE, i, length, neighbour, node != first), removal_gain - insertion_cost
+
+                    # insert before the neighbour: previous, other ... node, neighbour
+                    if j < i or j - 1 > end:
+                        insertion_cost = neighbour_distance
+                        left = None
+                        if j > 0:
+                            left = hypothesis[j - 1]
+                            insertion_cost += distance(left, other) - distance(left, neighbour)
+                        if removal_gain - insertion_cost > MIN_IMPROVEMENT:
+                            return (OR_OPT_MOVE, i, length, left, node == first), removal_gain - insertion_cost
+
+        return None, 0
+
+    def apply_move(self, hypothesis, move):
+        """
+        applies a move found by find_improving_move in place and puts the nodes at the changed edges into the queue
+        :param hypothesis: hypothesis as list
+        :param move: move
+        """
+        if hypothesis is not self.hypothesis:
+            self.start(hypothesis)
+
+        if move[0] == TWO_OPT_MOVE:
+            first_index, last_index = move[1], move[2]
+            reverse_segment(hypothesis, (first_index, last_index))
+            changed_positions = [first_index - 1, first_index, last_index, last_index + 1]
+        else:
+            i, length, left, reversed_segment = move[1:]
+            # nodes around the gap and the insertion point
+            changed_nodes = [hypothesis[position] for position in (i - 1, i, i + length - 1, i + length)
+                             if 0 <= position < len(hypothesis)]
+            if left is not None:
+                changed_nodes.append(left)
+            right_position = 0 if left is None else self.positions[left] + 1
+            if right_position < len(hypothesis):
+                changed_nodes.append(hypothesis[right_position])
+
+            segment = hypothesis[i:i + length]
+            if reversed_segment:
+                segment.reverse()
+            del hypothesis[i:i + length]
+            insert_index = right_position - (length if right_position > i else 0)
+            hypothesis[insert_index:insert_index] = segment
+            first_index = min(i, insert_index)
+            last_index = max(i, insert_index) + length - 1
+            changed_positions = []
+            for node in changed_nodes:
+                self.push(node)
+
+        for position in range(first_index, last_index + 1):
+            self.positions[hypothesis[position]] = position
+        for position in changed_positions:
+            if 0 <= position < len(hypothesis):
+                self.push(hypothesis[position])
+
+    def push(self, node):
+        """
+        clears the don't look bit of node
+        """
+        if not self.queued[node]:
+            self.queued[node] = True
+            self.queue.append(node)
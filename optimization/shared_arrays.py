@@ -0,0 +1,75 @@
+import sys
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+# instance attached by a pool worker process, see attach_worker_instance
+_worker_instance = None
+_worker_shared_memory = None
+
+
+def share_array(array):
+    """
+    copies an array into a new shared memory block, memory mapped arrays are shared through their file instead
+    :param array: numpy array
+    :return: shared memory block (None for memory mapped arrays, must be kept open by the caller and unlinked after
+             use) and picklable specification for attach_array
+    """
+    if isinstance(array, np.memmap) and array.filename is not None:
+        return None, ('file', array.filename, array.shape, array.dtype.str, array.offset)
+
+    shared_memory = SharedMemory(create=True, size=max(1, array.nbytes))
+    shared_array = np.ndarray(array.shape, dtype=array.dtype, buffer=shared_memory.buf)
+    shared_array[...] = array
+    return shared_memory, ('shared_memory', shared_memory.name, array.shape, array.dtype.str, 0)
+
+
+def attach_array(specification):
+    """
+    attaches to an array shared by share_array without copying it
+    :param specification: specification returned by share_array
+    :return: read only array and the opened shared memory block (None for memory mapped files), the block must be
+             referenced as long as the array is used
+    """
+    kind, name, shape, dtype, offset = specification
+    if kind == 'file':
+        return np.memmap(name, dtype=dtype, mode='r', shape=shape, offset=offset), None
+
+    shared_memory = _open_untracked_shared_memory(name)
+    array = np.ndarray(shape, dtype=dtype, buffer=shared_memory.buf)
+    array.flags.writeable = False
+    return array, shared_memory
+
+
+def attach_worker_instance(handle):
+    """
+    process pool initializer: attaches the instance shared by its share method once per worker process
+    :param handle: handle returned by share (instance class and specification)
+    """
+    global _worker_instance, _worker_shared_memory
+    instance_class, specification = handle
+    _worker_instance, _worker_shared_memory = instance_class.attach(specification)
+
+
+def get_worker_instance():
+    """
+    returns the instance attached by attach_worker_instance
+    """
+    return _worker_instance
+
+
+def _open_untracked_shared_memory(name):
+    """
+    opens an existing shared memory block without registering it at the resource tracker, only the creating process
+    owns (and unlinks) the block
+    """
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+
+    register = resource_tracker.register
+    resource_tracker.register = lambda resource_name, resource_type: None
+    try:
+        return SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
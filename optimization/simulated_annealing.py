@@ -1,71 +1,375 @@
 import math
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
+
+from optimization.checkpoint import CHECKPOINT_INTERVAL, load_checkpoint, save_checkpoint
+from optimization.cooling_schedules import LinearCooling, LogarithmicCooling, restore_schedule
+from optimization.shared_arrays import attach_worker_instance, get_worker_instance
+from optimization.stopping_criteria import *
+from telemetry import Telemetry
 
 
 class SimulatedAnnealer:
 
-    def __init__(self, fitness, move_one_step_at_random, build_start_hypothesis):
+    def __init__(self, fitness, move_one_step_at_random, build_start_hypothesis, fitness_delta=None, undo_move=None,
+                 observers=None, sample_interval=1000, checkpoint_path=None, checkpoint_interval=CHECKPOINT_INTERVAL):
         """
         creates an simulated annealing algorithm
         :param fitness: function
-        :param move_one_step_at_random: function
+        :param move_one_step_at_random: function, returns the new hypothesis (f.e. move_one_step_at_random) or - if
+                                        fitness_delta and undo_move are given - changes the hypothesis in place and
+                                        returns the performed move (f.e. random_swap)
         :param build_start_hypothesis: function
+        :param fitness_delta: optional function (hypothesis, move, data) -> fitness change of the applied move
+        :param undo_move: optional function (hypothesis, move) which reverts the move in place
+        :param observers: list of telemetry observers (f.e. PrintObserver), silent by default
+        :param sample_interval: iterations between two progress notifications of the observers
+        :param checkpoint_path: optional file the run state is saved to every checkpoint_interval iterations and at
+                                the end of run, hypotheses must be sequences of numbers, moves have to use the
+                                random module
+        :param checkpoint_interval: iterations between two checkpoints
         """
         self.fitness = fitness
         self.move_one_step_at_random = move_one_step_at_random
         self.build_start_hypothesis = build_start_hypothesis
+        self.fitness_delta = fitness_delta
+        self.undo_move = undo_move
+        self.telemetry = Telemetry(observers, sample_interval)
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
         self.data = None
         self.optimal_hypothesis = None
         self.iterations_needed = None
+        self.statistics = None
+        self.stop_reason = None
+        self.exchange_acceptance_rates = None
 
-    def run(self, data, temp, epsilon):
+    def run(self, data, temp, epsilon=None, schedule=None, min_temp=None, max_iterations=None, time_budget=None,
+            deadline=None, patience=None):
         """
         runs the simulated annealing algorithm
         :param data: data to optimize (f.e. distance matrix)
-        :param temp: start temperature
-        :param epsilon: value to decrease the temperature in each iteration
+        :param temp: start temperature, None to estimate it with estimate_start_temperature
+        :param epsilon: value to decrease the temperature in each iteration (linear cooling without schedule)
+        :param schedule: optional CoolingSchedule (f.e. GeometricCooling), replaces the linear cooling by epsilon
+        :param min_temp: temperature at which the annealing ends, defaults to epsilon or a thousandth of temp
+                         (LogarithmicCooling needs exp(999 / c) iterations for that, so it requires another limit)
+        :param max_iterations: optional maximal number of iterations
+        :param time_budget: optional seconds the run may take
+        :param deadline: optional time.time() timestamp the run has to be finished by
+        :param patience: optional number of iterations without new best fitness after which the run stops
         :return: optimal hypothesis and number of iterations
         """
+        if schedule is None:
+            if epsilon is None:
+                raise ValueError('epsilon or schedule is needed')
+            schedule = LinearCooling(epsilon)
+        if isinstance(schedule, LogarithmicCooling) and max_iterations is None and time_budget is None \
+                and deadline is None and patience is None:
+            raise ValueError('logarithmic cooling practically never reaches min_temp, set max_iterations, '
+                             'time_budget, deadline or patience')
         self.data = data
-        print('-' * 30 + 'Simulated Annealing' + '-' * 30)
         hypothesis = self.build_start_hypothesis(data)
-        print('Starting hypothesis:', str(hypothesis))
         last_fitness = self.fitness(hypothesis, data)
-        print('Starting fitness:', last_fitness)
-        print('-' * 40)
+        if temp is None:
+            temp = self.estimate_start_temperature(hypothesis, data)
+        if min_temp is None:
+            min_temp = epsilon if epsilon is not None else temp / 1000
+        if min_temp <= 0:
+            raise ValueError('min_temp must be positive')
+        schedule.start(temp)
+        self.telemetry.start(self, 'Simulated Annealing', last_fitness, temp)
+        state = {
+            'iteration': 0,
+            'accepted': 0,
+            'last_improvement': 0,
+            'last_fitness': last_fitness,
+            'best_fitness': last_fitness,
+            'temperature': temp,
+            'min_temp': min_temp,
+            'max_iterations': max_iterations,
+            'patience': patience,
+            'stop_reason': None
+        }
+        # the best hypothesis is only kept for the checkpoints, the run returns the last hypothesis
+        best_hypothesis = hypothesis.copy() if self.checkpoint_path is not None else None
+        return self.anneal(data, hypothesis, best_hypothesis, schedule, state, get_end_time(time_budget, deadline))
+
+    def resume(self, data, max_iterations=None, time_budget=None, deadline=None, checkpoint_path=None):
+        """
+        continues a run from its checkpoint with the saved hypotheses, temperature, schedule, counters and state of
+        the random module, a run continued from its last periodic checkpoint proceeds exactly as the interrupted run
+        :param data: data to optimize, the same as in the checkpointed run
+        :param max_iterations: optional new maximal number of iterations, defaults to the one of the checkpointed run
+        :param time_budget: optional seconds the resumed run may take
+        :param deadline: optional time.time() timestamp the resumed run has to be finished by
+        :param checkpoint_path: checkpoint to resume from, defaults to the checkpoint path of the annealer
+        :return: optimal hypothesis and number of iterations (including the ones before the checkpoint)
+        """
+        state, hypotheses = load_checkpoint(checkpoint_path or self.checkpoint_path)
+        schedule = restore_schedule(state.pop('schedule'))
+        if max_iterations is not None:
+            state['max_iterations'] = max_iterations
+        self.data = data
+        hypothesis = hypotheses['hypothesis']
+        finished = state['stop_reason'] in (TEMPERATURE, STAGNATION) or \
+            (state['max_iterations'] is not None and state['iteration'] >= state['max_iterations'])
+        if finished:
+            self.stop_reason = state['stop_reason']
+            self.optimal_hypothesis = hypothesis
+            self.iterations_needed = state['iteration']
+            return hypothesis, state['iteration']
+
+        self.telemetry.start(self, 'Simulated Annealing (resumed)', state['best_fitness'], state['temperature'],
+                             state['iteration'])
+        return self.anneal(data, hypothesis, hypotheses.get('best_hypothesis'), schedule, state,
+                           get_end_time(time_budget, deadline))
+
+    def anneal(self, data, hypothesis, best_hypothesis, schedule, state, end_time):
+        """
+        the annealing loop of run and resume
+        :param data: data to optimize
+        :param hypothesis: hypothesis to start with
+        :param best_hypothesis: best hypothesis so far, only tracked (not None) if checkpoints are written
+        :param schedule: cooling schedule
+        :param state: dictionary of counters, fitness values, temperature and stopping parameters, saved as metadata
+                      of the checkpoints
+        :param end_time: end time from get_end_time
+        :return: last hypothesis and number of iterations
+        """
+        temp = state['temperature']
+        last_fitness = state['last_fitness']
+        best_fitness = state['best_fitness']
+        accepted = state['accepted']
+        last_improvement = state['last_improvement']
+        min_temp = state['min_temp']
+        max_iterations = state['max_iterations']
+        patience = state['patience']
+        i = state['iteration']
+        telemetry = self.telemetry
+        next_sample = (i // telemetry.sample_interval + 1) * telemetry.sample_interval
+        next_checkpoint = (i // self.checkpoint_interval + 1) * self.checkpoint_interval \
+            if self.checkpoint_path is not None else -1
+        track_best = best_hypothesis is not None
+        incremental = self.fitness_delta is not None and self.undo_move is not None
         saved_hypothesis = None
-        i = 0
+        move = None
+        self.stop_reason = TEMPERATURE
 
         while True:  # do while
 
-            saved_hypothesis = hypothesis.copy()
-            hypothesis = self.move_one_step_at_random(hypothesis)
+            if incremental:
+                move = self.move_one_step_at_random(hypothesis)
+                new_fitness = last_fitness + self.fitness_delta(hypothesis, move, data)
+            else:
+                saved_hypothesis = hypothesis.copy()
+                hypothesis = self.move_one_step_at_random(hypothesis)
+                new_fitness = self.fitness(hypothesis, data)
             i += 1
 
-            new_fitness = self.fitness(hypothesis, data)
-            if new_fitness > last_fitness:
+            move_accepted = new_fitness > last_fitness or \
+                random.random() < math.exp((new_fitness - last_fitness) / temp)
+            if move_accepted:
                 last_fitness = new_fitness
+                accepted += 1
+                if last_fitness > best_fitness:
+                    best_fitness = last_fitness
+                    last_improvement = i
+                    if track_best:
+                        best_hypothesis = hypothesis.copy()
+                    telemetry.improvement(i, best_fitness, temp)
+            elif incremental:
+                self.undo_move(hypothesis, move)
             else:
-                probability = math.exp((new_fitness - last_fitness) / temp)
-                print(probability)
-                if random.random() < probability:
-                    last_fitness = new_fitness
-                    print('New fitness:', last_fitness, '( temp:', temp, ')')
-                else:
-                    hypothesis = saved_hypothesis
-            temp -= epsilon
-
-            if temp < epsilon:  # do while
-                print('Temperature:', temp, 'epsilon:', epsilon)
+                hypothesis = saved_hypothesis
+            temp = schedule.next_temperature(temp, i, move_accepted)
+
+            if i == next_sample:
+                telemetry.sample(i, accepted, i - accepted, last_fitness, temp)
+                next_sample += telemetry.sample_interval
+            if i == next_checkpoint:
+                state.update(iteration=i, accepted=accepted, last_improvement=last_improvement,
+                             last_fitness=last_fitness, best_fitness=best_fitness, temperature=temp)
+                self.write_checkpoint(hypothesis, best_hypothesis, schedule, state)
+                next_checkpoint += self.checkpoint_interval
+
+            if temp < min_temp:  # do while
+                break
+            if max_iterations is not None and i >= max_iterations:
+                self.stop_reason = ITERATIONS
+                break
+            if patience is not None and i - last_improvement >= patience:
+                self.stop_reason = STAGNATION
+                break
+            if time_is_up(i, end_time):
+                self.stop_reason = TIME
                 break
 
+        if self.checkpoint_path is not None:
+            state.update(iteration=i, accepted=accepted, last_improvement=last_improvement, last_fitness=last_fitness,
+                         best_fitness=best_fitness, temperature=temp, stop_reason=self.stop_reason)
+            self.write_checkpoint(hypothesis, best_hypothesis, schedule, state)
+        self.statistics = telemetry.finish(i, accepted, i - accepted, last_fitness, temp)
         self.optimal_hypothesis = hypothesis
         self.iterations_needed = i
         return hypothesis, i
 
+    def write_checkpoint(self, hypothesis, best_hypothesis, schedule, state):
+        """
+        saves the state of the run to the checkpoint path
+        """
+        save_checkpoint(self.checkpoint_path, dict(state, schedule=schedule.get_state()),
+                        {'hypothesis': hypothesis, 'best_hypothesis': best_hypothesis})
+
+    def estimate_start_temperature(self, hypothesis, data, acceptance=0.8, samples=100):
+        """
+        estimates a start temperature at which a worsening move is accepted with the given probability on average,
+        the sampled moves are reverted, the hypothesis stays unchanged
+        :param hypothesis: start hypothesis
+        :param data: data to optimize
+        :param acceptance: acceptance probability of an average worsening move
+        :param samples: number of sampled moves
+        :return: start temperature
+        """
+        incremental = self.fitness_delta is not None and self.undo_move is not None
+        start_fitness = None if incremental else self.fitness(hypothesis, data)
+        worsening = []
+
+        for i in range(samples):
+            if incremental:
+                move = self.move_one_step_at_random(hypothesis)
+                delta = self.fitness_delta(hypothesis, move, data)
+                self.undo_move(hypothesis, move)
+            else:
+                delta = self.fitness(self.move_one_step_at_random(hypothesis.copy()), data) - start_fitness
+            if delta < 0:
+                worsening.append(-delta)
+
+        if not worsening:
+            return 1.0
+        return (sum(worsening) / len(worsening)) / -math.log(acceptance)
+
+    def run_replica_exchange(self, data, temperatures, exchange_interval, exchanges, max_workers=None, seed=None):
+        """
+        runs the simulated annealing algorithm as parallel tempering: one chain per temperature is advanced at its
+        fixed temperature in a process pool and after each interval the states of neighbouring temperatures are
+        swapped with the metropolis criterion
+        data must provide a share method (f.e. DistanceMatrix or CoordinateInstance) and the functions of the annealer
+        must be picklable (defined at module level)
+        :param data: data to optimize (f.e. distance matrix)
+        :param temperatures: list of temperatures, one chain each
+        :param exchange_interval: metropolis steps of each chain between two exchanges
+        :param exchanges: number of exchange rounds
+        :param max_workers: number of processes, defaults to the number of temperatures or cpus
+        :param seed: seed for the chains and the exchanges
+        :return: optimal hypothesis and total number of iterations
+        """
+        self.data = data
+        rng = random.Random(seed)
+        functions = (self.fitness, self.move_one_step_at_random, self.fitness_delta, self.undo_move)
+        hypotheses = [self.build_start_hypothesis(data) for temp in temperatures]
+        fitness_values = [self.fitness(hypothesis, data) for hypothesis in hypotheses]
+        best_fitness = max(fitness_values)
+        best_hypothesis = hypotheses[fitness_values.index(best_fitness)].copy()
+        telemetry = self.telemetry
+        telemetry.start(self, 'Simulated Annealing (replica exchange)', best_fitness)
+        exchange_attempts = [0] * (len(temperatures) - 1)
+        exchange_accepts = [0] * (len(temperatures) - 1)
+
+        shared_memory, handle = data.share()
+        try:
+            with ProcessPoolExecutor(max_workers or min(len(temperatures), os.cpu_count()),
+                                     initializer=attach_worker_instance, initargs=(handle,)) as executor:
+                for exchange in range(exchanges):
+                    futures = [executor.submit(_anneal_replica, functions, hypotheses[k], fitness_values[k],
+                                               temperatures[k], exchange_interval, rng.getrandbits(64))
+                               for k in range(len(temperatures))]
+                    for k, future in enumerate(futures):
+                        hypotheses[k], fitness_values[k], replica_best_hypothesis, replica_best_fitness = \
+                            future.result()
+                        if replica_best_fitness > best_fitness:
+                            best_fitness = replica_best_fitness
+                            best_hypothesis = replica_best_hypothesis
+                            telemetry.improvement((exchange + 1) * exchange_interval, best_fitness,
+                                                  temperatures[k])
+
+                    # alternate between even and odd pairs so each pair is attempted every second round
+                    for k in range(exchange % 2, len(temperatures) - 1, 2):
+                        exchange_attempts[k] += 1
+                        exponent = (fitness_values[k + 1] - fitness_values[k]) * \
+                                   (1 / temperatures[k] - 1 / temperatures[k + 1])
+                        if exponent >= 0 or rng.random() < math.exp(exponent):
+                            exchange_accepts[k] += 1
+                            hypotheses[k], hypotheses[k + 1] = hypotheses[k + 1], hypotheses[k]
+                            fitness_values[k], fitness_values[k + 1] = fitness_values[k + 1], fitness_values[k]
+                    telemetry.sample((exchange + 1) * exchange_interval, sum(exchange_accepts),
+                                     sum(exchange_attempts) - sum(exchange_accepts), max(fitness_values))
+        finally:
+            if shared_memory is not None:
+                shared_memory.close()
+                shared_memory.unlink()
+
+        self.exchange_acceptance_rates = [accepts / attempts if attempts > 0 else 0
+                                          for accepts, attempts in zip(exchange_accepts, exchange_attempts)]
+        # accepted and rejected count the exchanges of the replicas
+        self.statistics = telemetry.finish(exchanges * exchange_interval, sum(exchange_accepts),
+                                           sum(exchange_attempts) - sum(exchange_accepts), max(fitness_values))
+        self.optimal_hypothesis = best_hypothesis
+        self.iterations_needed = exchanges * exchange_interval * len(temperatures)
+        return best_hypothesis, self.iterations_needed
+
     def print_result(self):
         print('-' * 20 + 'Simulated Annealing' + '-' * 20)
         print('Optimal fitness:', self.fitness(self.optimal_hypothesis, self.data))
         print('Iterations:', self.iterations_needed)
         print('Shortest round trip:', str(self.optimal_hypothesis),
               'distance:', self.fitness(self.optimal_hypothesis, self.data) * -1)
+
+
+def anneal_at_temperature(functions, hypothesis, last_fitness, data, temp, steps):
+    """
+    performs metropolis steps at a fixed temperature
+    :param functions: tuple of fitness, move_one_step_at_random, fitness_delta and undo_move (both may be None)
+    :param hypothesis: hypothesis to start with
+    :param last_fitness: fitness of hypothesis
+    :param data: data to optimize
+    :param temp: temperature
+    :param steps: number of steps
+    :return: last hypothesis, its fitness, best hypothesis and its fitness
+    """
+    fitness, move_one_step_at_random, fitness_delta, undo_move = functions
+    incremental = fitness_delta is not None and undo_move is not None
+    best_hypothesis = hypothesis.copy()
+    best_fitness = last_fitness
+    saved_hypothesis = None
+    move = None
+
+    for i in range(steps):
+        if incremental:
+            move = move_one_step_at_random(hypothesis)
+            new_fitness = last_fitness + fitness_delta(hypothesis, move, data)
+        else:
+            saved_hypothesis = hypothesis.copy()
+            hypothesis = move_one_step_at_random(hypothesis)
+            new_fitness = fitness(hypothesis, data)
+
+        if new_fitness > last_fitness or random.random() < math.exp((new_fitness - last_fitness) / temp):
+            last_fitness = new_fitness
+            if last_fitness > best_fitness:
+                best_fitness = last_fitness
+                best_hypothesis = hypothesis.copy()
+        elif incremental:
+            undo_move(hypothesis, move)
+        else:
+            hypothesis = saved_hypothesis
+
+    return hypothesis, last_fitness, best_hypothesis, best_fitness
+
+
+def _anneal_replica(functions, hypothesis, last_fitness, temp, steps, seed):
+    """
+    advances one replica in a worker process on the instance attached by the pool initializer
+    """
+    random.seed(seed)
+    return anneal_at_temperature(functions, hypothesis, last_fitness, get_worker_instance(), temp, steps)
@@ -0,0 +1,37 @@
+import time
+
+# iterations between two clock reads of the time budget check
+TIME_CHECK_INTERVAL = 256
+
+# reasons why a run stopped
+ITERATIONS = 'iterations'
+TIME = 'time'
+STAGNATION = 'stagnation'
+TEMPERATURE = 'temperature'
+LOCAL_OPTIMUM = 'local_optimum'
+
+
+def get_end_time(time_budget=None, deadline=None):
+    """
+    combines a time budget and a deadline to the time.perf_counter() value at which a run has to stop
+    :param time_budget: seconds the run may take
+    :param deadline: absolute time.time() timestamp the run has to be finished by
+    :return: end time or None if the run is not time bounded
+    """
+    now = time.perf_counter()
+    end_times = []
+    if time_budget is not None:
+        end_times.append(now + time_budget)
+    if deadline is not None:
+        end_times.append(now + deadline - time.time())
+    return min(end_times) if end_times else None
+
+
+def time_is_up(iteration, end_time):
+    """
+    checks the clock every TIME_CHECK_INTERVAL iterations
+    :param iteration: current iteration
+    :param end_time: end time from get_end_time
+    :return: True if the end time has passed
+    """
+    return end_time is not None and iteration % TIME_CHECK_INTERVAL == 0 and time.perf_counter() >= end_time
@@ -1,41 +1,219 @@
 import random
 
+import numpy as np
+
+from optimization.coordinate_instance import CoordinateInstance
+from optimization.distance_matrix import DistanceMatrix
+
+# instance types which provide distance, distances and tour_length themselves
+INSTANCE_TYPES = (DistanceMatrix, CoordinateInstance)
+# smallest fitness delta accepted as improvement, protects against float rounding noise
+MIN_IMPROVEMENT = 1e-9
+# number of (i, j) pairs evaluated at once by the 2-opt neighbourhood
+TWO_OPT_BLOCK_SIZE = 2 ** 20
+
 
 def fitness(hypothesis, distance_matrix):
     """
     computes the hypothesis' fitness
     :param hypothesis: hypothesis
-    :param distance_matrix: distances
+    :param distance_matrix: distances as DistanceMatrix, CoordinateInstance or two dimensional list
     :return: fitness value
     """
+    if isinstance(distance_matrix, INSTANCE_TYPES):
+        return distance_matrix.tour_length(hypothesis) * -1
     fitness = sum([distance_matrix[hypothesis[i]][hypothesis[i + 1]]
                    for i in range(len(hypothesis)) if i < len(hypothesis) - 1])
     return fitness * -1
 
 
-def move_one_step_at_random(hypothesis):
+def get_distance_function(distance_matrix):
     """
-    returns a random hypothesis by swapping two random indices
-    :param hypothesis: old hypothesis
-    :return: new hypothesis
+    returns a function (first node, second node) -> distance for the given distances
+    :param distance_matrix: distances as DistanceMatrix, CoordinateInstance or two dimensional list
+    :return: distance function
     """
-    try:
-        # generate random indices
-        first_index = random.randint(0, len(hypothesis) - 1)
-        second_index = None
-        while second_index is None or second_index == first_index:
-            second_index = random.randint(0, len(hypothesis) - 1)
+    if isinstance(distance_matrix, INSTANCE_TYPES):
+        return distance_matrix.distance
+    return lambda first, second: distance_matrix[first][second]
+
+
+def get_distances_function(distance_matrix):
+    """
+    returns a vectorized function (first node array, second node array) -> distance array for the given distances,
+    the arrays are broadcast against each other
+    :param distance_matrix: distances as DistanceMatrix, CoordinateInstance or two dimensional list
+    :return: distances function
+    """
+    if isinstance(distance_matrix, INSTANCE_TYPES):
+        distances = distance_matrix.distances
+    else:
+        array = np.asarray(distance_matrix)
+
+        def distances(first, second):
+            return array[first, second]
 
-        # swaps indices
-        tmp = hypothesis[first_index]
-        hypothesis[first_index] = hypothesis[second_index]
-        hypothesis[second_index] = tmp
-    except IndexError:
-        pass
+    def wide_distances(first, second):
+        # computes in 64 bit to avoid overflows of small distance dtypes
+        values = distances(first, second)
+        return values.astype(np.float64 if values.dtype.kind == 'f' else np.int64, copy=False)
 
+    return wide_distances
+
+
+def move_one_step_at_random(hypothesis, rng=random):
+    """
+    returns a random hypothesis by swapping two random indices, for the copy based runs of HillClimber and
+    SimulatedAnnealer (without fitness_delta and undo_move)
+    :param hypothesis: old hypothesis (changed in place)
+    :param rng: random number generator (random module or random.Random instance)
+    :return: new hypothesis
+    """
+    random_swap(hypothesis, rng)
     return hypothesis
 
 
+def random_swap(hypothesis, rng=random):
+    """
+    swaps two random indices of the hypothesis in place, for the incremental runs together with swap_fitness_delta
+    and undo_swap
+    :param hypothesis: hypothesis to change
+    :param rng: random number generator (random module or random.Random instance)
+    :return: performed move as tuple of the swapped indices or None if the hypothesis is too short to swap
+    """
+    if len(hypothesis) < 2:
+        return None
+
+    # generate random indices
+    first_index = rng.randint(0, len(hypothesis) - 1)
+    second_index = rng.randint(0, len(hypothesis) - 2)
+    if second_index >= first_index:
+        second_index += 1
+
+    swap(hypothesis, (first_index, second_index))
+    return first_index, second_index
+
+
+def swap(hypothesis, move):
+    """
+    swaps the two indices of move in place, applying a swap twice restores the original hypothesis
+    :param hypothesis: hypothesis to change
+    :param move: tuple of two indices
+    """
+    if move is None:
+        return
+    first_index, second_index = move
+    hypothesis[first_index], hypothesis[second_index] = hypothesis[second_index], hypothesis[first_index]
+
+
+def undo_swap(hypothesis, move):
+    """
+    reverts a move made by random_swap in place
+    :param hypothesis: hypothesis the move was applied to
+    :param move: move returned by random_swap
+    """
+    swap(hypothesis, move)
+
+
+def swap_fitness_delta(hypothesis, move, distance_matrix):
+    """
+    computes the fitness change caused by a swap that was already applied to the hypothesis, only the (at most four)
+    edges touching the swapped indices are looked at
+    :param hypothesis: hypothesis after the move
+    :param move: move returned by random_swap
+    :param distance_matrix: distances
+    :return: fitness after the move minus fitness before the move
+    """
+    if move is None:
+        return 0
+    first_index, second_index = move
+
+    def node_before_move(index):
+        if index == first_index:
+            return hypothesis[second_index]
+        if index == second_index:
+            return hypothesis[first_index]
+        return hypothesis[index]
+
+    # edge k connects the indices k and k + 1, a set avoids counting the shared edge of adjacent indices twice
+    edges = {k for index in move for k in (index - 1, index) if 0 <= k < len(hypothesis) - 1}
+    distance = get_distance_function(distance_matrix)
+    distance_before = sum([distance(node_before_move(k), node_before_move(k + 1)) for k in edges])
+    distance_after = sum([distance(hypothesis[k], hypothesis[k + 1]) for k in edges])
+    return distance_before - distance_after
+
+
+def find_two_opt_move(hypothesis, distance_matrix, first_improvement=False, block_size=TWO_OPT_BLOCK_SIZE):
+    """
+    evaluates the fitness delta of reversing every segment hypothesis[i..j] (i < j) with numpy, the pairs are
+    evaluated in blocks of rows i to bound the memory
+    :param hypothesis: hypothesis
+    :param distance_matrix: distances
+    :param first_improvement: return the best move of the first block containing an improvement instead of the best
+                              move of the whole neighbourhood
+    :param block_size: maximal number of pairs evaluated at once
+    :return: move (i, j) and its fitness delta, (None, 0) if no reversal improves the hypothesis
+    """
+    nodes = np.asarray(hypothesis)
+    number_of_nodes = len(nodes)
+    if number_of_nodes < 3:
+        return None, 0
+    distances = get_distances_function(distance_matrix)
+
+    # edge lengths entering (before) and leaving (after) each position, the path ends have no such edge
+    edges = distances(nodes[:-1], nodes[1:])
+    before = np.concatenate(([0], edges))
+    after = np.concatenate((edges, [0]))
+    # nodes following each position j, the last position is masked out below
+    next_nodes = np.append(nodes[1:], nodes[-1])
+    has_next = np.arange(number_of_nodes) < number_of_nodes - 1
+
+    best_move = None
+    best_delta = 0
+    rows = max(1, block_size // number_of_nodes)
+    columns = np.arange(number_of_nodes)
+    for first_row in range(0, number_of_nodes - 1, rows):
+        i = np.arange(first_row, min(first_row + rows, number_of_nodes - 1))[:, np.newaxis]
+        # reversing i..j replaces the edges (i - 1, i) and (j, j + 1) by (i - 1, j) and (i, j + 1)
+        new_first = np.where(i > 0, distances(nodes[i - 1], nodes[columns]), 0)
+        new_second = np.where(has_next, distances(nodes[i], next_nodes[columns]), 0)
+        delta = before[i] + after[columns] - new_first - new_second
+        delta = np.where(columns > i, delta, 0)
+
+        index = np.argmax(delta)
+        if delta.flat[index] > max(best_delta, MIN_IMPROVEMENT):
+            best_delta = delta.flat[index].item()
+            best_move = (first_row + index // number_of_nodes, index % number_of_nodes)
+            if first_improvement:
+                break
+
+    return best_move, best_delta
+
+
+def steepest_two_opt_move(hypothesis, distance_matrix):
+    """
+    returns the best 2-opt move of the whole neighbourhood and its fitness delta
+    """
+    return find_two_opt_move(hypothesis, distance_matrix)
+
+
+def first_two_opt_move(hypothesis, distance_matrix):
+    """
+    returns an improving 2-opt move from the first block of rows which contains one and its fitness delta
+    """
+    return find_two_opt_move(hypothesis, distance_matrix, first_improvement=True)
+
+
+def reverse_segment(hypothesis, move):
+    """
+    applies a 2-opt move by reversing hypothesis[i..j] in place
+    :param hypothesis: hypothesis to change
+    :param move: tuple (i, j)
+    """
+    first_index, second_index = move
+    hypothesis[first_index:second_index + 1] = hypothesis[first_index:second_index + 1][::-1]
+
+
 def build_start_hypothesis(distance_matrix):
     """
     returns the starting hypothesis of a distance matrix
@@ -45,22 +223,49 @@ def build_start_hypothesis(distance_matrix):
     return list(range(len(distance_matrix)))
 
 
-def generate_distance_matrix(number_of_nodes, max_distance):
+def build_random_start_hypothesis(distance_matrix, rng=random):
+    """
+    returns a random permutation of the nodes of a distance matrix
+    :param distance_matrix: distance matrix
+    :param rng: random number generator (random module or random.Random instance)
+    :return: starting hypothesis
+    """
+    hypothesis = build_start_hypothesis(distance_matrix)
+    rng.shuffle(hypothesis)
+    return hypothesis
+
+
+def build_nearest_neighbour_hypothesis(distance_matrix, start_node=0):
+    """
+    returns the greedy round trip which always continues with the nearest unvisited node
+    :param distance_matrix: distance matrix
+    :param start_node: first node of the hypothesis
+    :return: starting hypothesis
+    """
+    distances = get_distances_function(distance_matrix)
+    number_of_nodes = len(distance_matrix)
+    all_nodes = np.arange(number_of_nodes)
+    visited = np.zeros(number_of_nodes, dtype=bool)
+    hypothesis = [start_node]
+    visited[start_node] = True
+
+    for i in range(number_of_nodes - 1):
+        node_distances = np.where(visited, np.inf, distances(hypothesis[-1], all_nodes))
+        nearest_node = int(np.argmin(node_distances))
+        hypothesis.append(nearest_node)
+        visited[nearest_node] = True
+
+    return hypothesis
+
+
+def generate_distance_matrix(number_of_nodes, max_distance, dtype=np.int32, packed=False, seed=None):
     """
     generates a matrix with random distance between a variable number of nodes
     :param number_of_nodes: number of nodes
     :param max_distance: maximal distance between to nodes
-    :return: two dimensional distance matrix
+    :param dtype: numpy dtype of the distances (f.e. int16, int32 or float32)
+    :param packed: store only the upper triangle of the symmetric matrix
+    :param seed: seed of the random number generator
+    :return: DistanceMatrix
     """
-    distance_matrix = [[0 for i in range(number_of_nodes)] for j in range(number_of_nodes)]
-
-    for i in range(number_of_nodes):
-        for j in range(number_of_nodes):
-            if i == j:
-                distance_matrix[i][j] = 0
-            elif i > j and distance_matrix[j][i] != 0:
-                distance_matrix[i][j] = distance_matrix[j][i]
-            else:
-                distance_matrix[i][j] = random.randint(1, max_distance)
-
-    return distance_matrix
+    return DistanceMatrix.generate(number_of_nodes, max_distance, dtype, packed, seed)
@@ -1,6 +1,7 @@
 from optimization.hill_climbing import *
 from optimization.simulated_annealing import *
 from optimization.tsp_methods import *
+from telemetry import PrintObserver
 
 NUMBER_OF_NODES = 8
 MAX_DISTANCE = 10
@@ -22,14 +23,20 @@ if __name__ == '__main__':
         print(distance_array)
 
     # run algorithms
-    hillClimber = HillClimber(fitness, move_one_step_at_random, build_start_hypothesis)
+    hillClimber = HillClimber(fitness, random_swap, build_start_hypothesis,
+                              swap_fitness_delta, undo_swap, observers=[PrintObserver()])
     hillClimber.run(distance_matrix, ITERATIONS)
-    simulatedAnnealer = SimulatedAnnealer(fitness, move_one_step_at_random, build_start_hypothesis)
+    twoOptHillClimber = HillClimber(fitness, move_one_step_at_random, build_start_hypothesis,
+                                    observers=[PrintObserver()])
+    twoOptHillClimber.run_local_search(distance_matrix, steepest_two_opt_move, reverse_segment)
+    simulatedAnnealer = SimulatedAnnealer(fitness, random_swap, build_start_hypothesis,
+                                          swap_fitness_delta, undo_swap, observers=[PrintObserver()])
     simulatedAnnealer.run(distance_matrix, TEMP, EPSILON)
     print()
 
     # print results
     hillClimber.print_result()
+    twoOptHillClimber.print_result()
     simulatedAnnealer.print_result()
 
 
@@ -1,7 +1,9 @@
+import os
 import time
 from OpenGL.GLUT import *
 from OpenGL.GL import *
 from reinforcement_learning.reinforcement_learning_structures import *
+from reinforcement_learning.vectorized_ping_pong import VectorizedPingPong, Q_TABLE_PATH
 
 # reinforcement learning parameters
 EPISODES = 5000
@@ -9,6 +11,9 @@ LEARNING_RATE = 0.01
 DISCOUNT_FACTOR = 0.9
 SELECT_ACTION_STRATEGY = E_GREEDY  # SOFTMAX, GREEDY, E_GREEDY
 EPSILON = 0.1
+# train with games played in parallel (VectorizedPingPong) instead of stepping this game through all episodes
+VECTORIZED_TRAINING = True
+NUMBER_OF_GAMES = 64
 
 # actions: types of moving the bat
 
@@ -75,9 +80,17 @@ class BasicGame(GameGL, ReinforcementLearningDomain):
                                                 EPSILON)
 
         self.agent.init_state(self.get_state())
-        self.learning = True
-        self.agent.learn()
-        self.learning = False
+        # trained q table (f.e. of python -m reinforcement_learning.vectorized_ping_pong), delete it to train again
+        if os.path.exists(Q_TABLE_PATH):
+            self.agent.load(Q_TABLE_PATH)
+        else:
+            self.learning = True
+            if VECTORIZED_TRAINING:
+                self.agent.learn_batch(VectorizedPingPong(NUMBER_OF_GAMES))
+            else:
+                self.agent.learn()
+            self.learning = False
+            self.agent.save(Q_TABLE_PATH)
 
     def action(self, action_index):
 
@@ -0,0 +1,64 @@
+import numpy as np
+
+
+def greedy(q_values, rng=np.random):
+    """
+    selects the actions with the highest q value, ties are broken randomly
+    :param q_values: q values of one state (A,) or of a batch of states (N, A)
+    :param rng: numpy random generator or the np.random module
+    :return: action index for one state, array of N action indices for a batch
+    """
+    q_values = np.asarray(q_values)
+    rows = np.atleast_2d(q_values)
+    is_max = rows == rows.max(axis=1, keepdims=True)
+    # random keys only for the maxima of each row, so argmax picks one of them uniformly
+    action_indices = np.argmax(np.where(is_max, rng.random(rows.shape), -1.0), axis=1)
+    return int(action_indices[0]) if q_values.ndim == 1 else action_indices
+
+
+def epsilon_greedy(q_values, epsilon, rng=np.random):
+    """
+    selects a random action with probability epsilon and a greedy action otherwise
+    :param q_values: q values of one state (A,) or of a batch of states (N, A)
+    :param epsilon: probability of a random action
+    :param rng: numpy random generator or the np.random module
+    :return: action index for one state, array of N action indices for a batch
+    """
+    q_values = np.asarray(q_values)
+    rows = np.atleast_2d(q_values)
+    action_indices = greedy(rows, rng)
+    explore = rng.random(len(rows)) < epsilon
+    random_actions = (rng.random(len(rows)) * rows.shape[1]).astype(np.int64)
+    action_indices = np.where(explore, random_actions, action_indices)
+    return int(action_indices[0]) if q_values.ndim == 1 else action_indices
+
+
+def softmax_probabilities(q_values, temperature=1.0):
+    """
+    boltzmann distribution over the actions, the maximum is subtracted before exponentiating so large q values or
+    small temperatures do not overflow
+    :param q_values: q values of one state (A,) or of a batch of states (N, A)
+    :param temperature: temperature > 0, high values approach a uniform and low values a greedy selection
+    :return: probabilities in the shape of q_values
+    """
+    if temperature <= 0:
+        raise ValueError('temperature must be greater than 0')
+    q_values = np.asarray(q_values, dtype=float)
+    exponentials = np.exp((q_values - q_values.max(axis=-1, keepdims=True)) / temperature)
+    return exponentials / exponentials.sum(axis=-1, keepdims=True)
+
+
+def softmax(q_values, temperature=1.0, rng=np.random):
+    """
+    samples actions from the boltzmann distribution over the q values
+    :param q_values: q values of one state (A,) or of a batch of states (N, A)
+    :param temperature: temperature > 0
+    :param rng: numpy random generator or the np.random module
+    :return: action index for one state, array of N action indices for a batch
+    """
+    q_values = np.asarray(q_values)
+    rows = np.atleast_2d(q_values)
+    cumulative = np.cumsum(softmax_probabilities(rows, temperature), axis=1)
+    # inverse transform sampling, the clip guards against rounding of the last cumulative probability
+    action_indices = np.minimum((cumulative < rng.random((len(rows), 1))).sum(axis=1), rows.shape[1] - 1)
+    return int(action_indices[0]) if q_values.ndim == 1 else action_indices
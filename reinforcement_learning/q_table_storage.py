@@ -0,0 +1,51 @@
+import json
+import os
+
+import numpy as np
+
+from utils import write_atomically
+
+# version of the q table file layout
+Q_TABLE_VERSION = 1
+
+
+def metadata_path(path):
+    """
+    :param path: path of the .npy file of a q table
+    :return: path of the json file with its metadata
+    """
+    return os.path.splitext(path)[0] + '.json'
+
+
+def save_q_table(path, q_table, metadata):
+    """
+    saves a q table as uncompressed .npy file (which can be memory mapped) and its metadata as json file next to it
+    :param path: path of the .npy file
+    :param q_table: (states, actions) array
+    :param metadata: json serializable dictionary
+    """
+    q_table = np.ascontiguousarray(q_table)
+    metadata = dict(metadata, format_version=Q_TABLE_VERSION, shape=list(q_table.shape), dtype=str(q_table.dtype))
+    write_atomically(path, lambda file: np.save(file, q_table, allow_pickle=False))
+    write_atomically(metadata_path(path), lambda file: file.write(
+        json.dumps(metadata, indent=2, default=lambda value: value.item()).encode('utf-8')))
+
+
+def load_q_table(path, mmap_mode='c'):
+    """
+    loads a q table saved by save_q_table
+    :param path: path of the .npy file
+    :param mmap_mode: memory map mode of np.load: 'c' (copy on write, processes share the pages until they write), 'r'
+                      (read only) or None (load into memory)
+    :return: q table and metadata dictionary
+    :raise ValueError: if the format version or the shape of the table do not match the metadata
+    """
+    with open(metadata_path(path)) as file:
+        metadata = json.load(file)
+    if metadata.get('format_version') != Q_TABLE_VERSION:
+        raise ValueError('unsupported q table format of ' + str(path))
+    q_table = np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+    if list(q_table.shape) != metadata['shape']:
+        raise ValueError('shape {} of {} does not match its metadata {}'.format(q_table.shape, path,
+                                                                                 metadata['shape']))
+    return q_table, metadata
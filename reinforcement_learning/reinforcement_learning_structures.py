@@ -1,9 +1,9 @@
-import random
 from abc import abstractmethod
 import numpy as np
-import math
 
-from utils import get_random_index_with_probabilities
+from reinforcement_learning import policies
+from reinforcement_learning.q_table_storage import save_q_table, load_q_table
+from reinforcement_learning.state_encoder import StateEncoder
 
 
 # selection strategies
@@ -32,7 +32,7 @@ class ReinforcementLearningAgent:
     """
 
     def __init__(self, reinforcement_learning_domain,
-                 episodes, discount_factor, learning_rate, select_action_strategy, epsilon=0.1):
+                 episodes, discount_factor, learning_rate, select_action_strategy, epsilon=0.1, temperature=1.0):
         """
         creates a new reinforcement learning environment
         :param reinforcement_learning_domain: application domain with domain specific structures as actions and max
@@ -42,6 +42,7 @@ class ReinforcementLearningAgent:
         :param learning_rate: alpha
         :param select_action_strategy: strategy for action selection: 'greedy', 'e_greedy' or 'softmax'
         :param epsilon: probability for epsilon greedy action selection
+        :param temperature: temperature of the softmax action selection
         """
 
         # parameter
@@ -49,11 +50,13 @@ class ReinforcementLearningAgent:
         self.actions = reinforcement_learning_domain.actions
         self.state_dimension_values = reinforcement_learning_domain.state_dimension_values
         self.dimension_sizes = [len(dimension_value_list) for dimension_value_list in self.state_dimension_values]
+        self.state_encoder = StateEncoder(self.state_dimension_values)
         self.episodes = episodes
         self.discount_factor = discount_factor
         self.learning_rate = learning_rate
         self.select_action_strategy = select_action_strategy
         self.epsilon = epsilon
+        self.temperature = temperature
 
         # attributes
         self.q_table = []  # table of x rows (parameter combinations) with y columns (number of actions) with q values
@@ -78,6 +81,29 @@ class ReinforcementLearningAgent:
                 if self.state_terminated:
                     break
 
+    def learn_batch(self, environment):
+        """
+        learns self.episodes episodes with an environment that plays several games at once (f.e. VectorizedPingPong),
+        each game whose episode ended counts as one episode
+        :param environment: object with reset() -> (N, dimensions) states and
+                            step(action_indices) -> (N,) rewards, (N, dimensions) future states, (N,) terminated
+        :return: number of steps
+        """
+        self.initialize_q_values_arbitrarily()
+        state_indices = self.state_encoder.encode_batch(environment.reset())
+        episodes = 0
+        steps = 0
+
+        while episodes < self.episodes:
+            action_indices = self.select_action(state_indices)
+            rewards, future_states, terminated = environment.step(action_indices)
+            future_state_indices = self.state_encoder.encode_batch(future_states)
+            self.update_q_table_batch(state_indices, action_indices, rewards, future_state_indices)
+            state_indices = future_state_indices
+            episodes += np.count_nonzero(terminated)
+            steps += 1
+        return steps
+
     def state_reaction(self, state=None):
 
         state_index = self.state_index if state is None else self.get_state_index(state)
@@ -101,6 +127,31 @@ class ReinforcementLearningAgent:
             = self.q_learning_update_formula(self.state_index, action_index,
                                              reward, future_state_index)
 
+    def update_q_table_batch(self, state_indices, action_indices, rewards, future_state_indices):
+        """
+        q learning update of a batch of transitions at once, the targets use the q values before the batch and
+        transitions of the same state and action are applied one after the other in batch order: k updates of a cell
+        with targets t_1, ..., t_k result in (1 - alpha)^k q + sum of alpha (1 - alpha)^(k - i) t_i
+        :param state_indices: (N,) array of state indices
+        :param action_indices: (N,) array of performed actions
+        :param rewards: (N,) array of rewards
+        :param future_state_indices: (N,) array of future state indices
+        """
+        if len(state_indices) == 0:
+            return
+        targets = rewards + self.discount_factor * self.q_table[future_state_indices].max(axis=1)
+        cells = np.asarray(state_indices) * len(self.actions) + action_indices
+        order = np.argsort(cells, kind='stable')
+        cells = cells[order]
+        unique_cells, first, counts = np.unique(cells, return_index=True, return_counts=True)
+        # number of later updates of the same cell in the batch
+        later_updates = np.repeat(first + counts, counts) - np.arange(len(cells)) - 1
+        weighted_targets = np.add.reduceat(
+            self.learning_rate * (1 - self.learning_rate) ** later_updates * targets[order], first)
+        rows, columns = np.divmod(unique_cells, len(self.actions))
+        self.q_table[rows, columns] = (1 - self.learning_rate) ** counts * self.q_table[rows, columns] \
+            + weighted_targets
+
     def q_learning_update_formula(self, state_index, action_index, reward, future_state_index):
         """
         updates a the reward q value of state using reward and future state
@@ -117,48 +168,30 @@ class ReinforcementLearningAgent:
     def select_action(self, state_index):
         """
         selects an action to take
-        :param state_index: index of current state
+        :param state_index: index of current state or array of state indices
         greedy: best reward
         e-greedy: best reward action with probability 1 - self.epsilon, random action with probability self.epsilon
         softmax: use of weighted probabilities
-        :return:
+        :return: action index or array of action indices
         """
         if self.select_action_strategy == GREEDY:
             return self.greedy_selection(state_index)
 
         elif self.select_action_strategy == E_GREEDY:
-            return random.randint(0, len(self.actions) - 1) if random.random() < self.epsilon \
-                else self.greedy_selection(state_index)
+            return policies.epsilon_greedy(self.q_table[state_index], self.epsilon)
 
         elif self.select_action_strategy == SOFTMAX:
-            probabilities = [(math.exp(self.q_table[state_index, a] / state_index) /
-                              sum([math.exp(self.q_table[state_index, b] / state_index)
-                                   for b in range(len(self.actions)) if b != a]))
-                             for a in range(len(self.actions))]
-            return get_random_index_with_probabilities(probabilities)
+            return policies.softmax(self.q_table[state_index], self.temperature)
         else:
             raise Exception('select action strategy must be greedy, e_greedy or softmax')
 
     def greedy_selection(self, state_index):
         """
-        :param state_index: index of state to select action from
-        greedy action selection
-        :return: index of best action
+        :param state_index: index of state or array of state indices to select action from
+        greedy action selection, ties are broken randomly
+        :return: index of best action or array of indices
         """
-        action_rewards = self.q_table[state_index]
-        if self.reinforcement_learning_domain.learning is False:
-            # print(action_rewards)
-            pass
-        max_reward_action_index = 0
-
-        for idx, value in np.ndenumerate(self.q_table[state_index]):
-            if value > action_rewards[max_reward_action_index]:
-                max_reward_action_index = idx[0]  # idx in numpy enumeration is tupel (idx,)
-
-        return max_reward_action_index
-
-    def softmax_e_quotient(self, state_index, action_index):
-        return math.exp(self.q_table[state_index, action_index] / state_index)
+        return policies.greedy(self.q_table[state_index])
 
     def initialize_q_values_arbitrarily(self):
         """
@@ -172,6 +205,43 @@ class ReinforcementLearningAgent:
         elif self.select_action_strategy == SOFTMAX:
             self.q_table = np.zeros(shape)
 
+    def save(self, path):
+        """
+        saves the q table as .npy file with a json file of the state dimensions, actions and hyperparameters next to it
+        :param path: path of the .npy file
+        """
+        save_q_table(path, self.q_table, {
+            'state_dimension_values': [np.asarray(values).tolist() for values in self.state_dimension_values],
+            'actions': [getattr(action, '__name__', str(action)) for action in self.actions],
+            'episodes': self.episodes,
+            'discount_factor': self.discount_factor,
+            'learning_rate': self.learning_rate,
+            'select_action_strategy': self.select_action_strategy,
+            'epsilon': self.epsilon,
+            'temperature': self.temperature
+        })
+
+    def load(self, path, mmap_mode='c'):
+        """
+        loads a q table saved by save as memory map, so several processes share one table without copying it, with the
+        default copy on write mode the table can still be updated in memory without changing the file
+        :param path: path of the .npy file
+        :param mmap_mode: memory map mode of np.load ('c', 'r' or None to load it into memory)
+        :return: metadata of the table (state dimensions, actions and hyperparameters of the training)
+        :raise ValueError: if the table was trained with other state dimensions or another number of actions
+        """
+        q_table, metadata = load_q_table(path, mmap_mode)
+        state_dimension_values = [np.asarray(values).tolist() for values in self.state_dimension_values]
+        if metadata['state_dimension_values'] != state_dimension_values:
+            raise ValueError('q table {} was trained with the state dimensions {}, not {}'.format(
+                path, metadata['state_dimension_values'], state_dimension_values))
+        # only the number of actions is checked, the names depend on the domain the table was trained with
+        if len(metadata['actions']) != len(self.actions):
+            raise ValueError('q table {} was trained with {} actions, not {}'.format(
+                path, len(metadata['actions']), len(self.actions)))
+        self.q_table = q_table
+        return metadata
+
     def init_state(self, state):
         """
         initializes the state with a given parameter set as properties and save the parameters
@@ -186,14 +256,9 @@ class ReinforcementLearningAgent:
         returns index of multidimensional state in q_table
         :param state: list of state parameter values
         :return: state index
+        :raise ValueError: if a value is not one of the values of its dimension
         """
-        dim_value_indices = [np.where(self.state_dimension_values[dim_idx] == dim_value)[0][0]
-                             for dim_idx, dim_value in enumerate(state)]
-
-        state_index = dim_value_indices[0]
-        for dimension_idx, size in enumerate(self.dimension_sizes[1:]):
-            state_index = state_index * size + dim_value_indices[dimension_idx + 1]
-        return state_index
+        return self.state_encoder.encode(state)
 
     def update_state_index(self, state):
         self.state_index = self.get_state_index(state)
@@ -0,0 +1,110 @@
+import numpy as np
+
+# integer dimensions whose value range is at most this many times their number of values get an offset lookup array,
+# sparser ones are searched in their sorted values
+MAX_LOOKUP_SPARSITY = 8
+
+
+class StateEncoder:
+    """
+    maps states (one value per dimension) to row indices of a q table and back with a mixed radix number: the index
+    of the value in the first dimension is the most significant digit, the index in the last dimension the least
+    the value to index lookups are built once: a dictionary per dimension for single states and an offset lookup array
+    (dense integer values) or a sorted value array (other values) per dimension for batches
+    """
+
+    def __init__(self, state_dimension_values):
+        """
+        creates a state encoder
+        :param state_dimension_values: list of arrays with the possible values of each state dimension
+        """
+        self.state_dimension_values = [np.asarray(values) for values in state_dimension_values]
+        self.dimension_sizes = [len(values) for values in self.state_dimension_values]
+        if not self.dimension_sizes or min(self.dimension_sizes) == 0:
+            raise ValueError('each state dimension needs at least one value')
+        self.number_of_states = int(np.prod(self.dimension_sizes))
+        # weight of each digit of the mixed radix number
+        self.strides = np.array([int(np.prod(self.dimension_sizes[dimension + 1:]))
+                                 for dimension in range(len(self.dimension_sizes))], dtype=np.int64)
+
+        self.index_dicts = []
+        self.lookups = []
+        for dimension, values in enumerate(self.state_dimension_values):
+            index_dict = {value: index for index, value in enumerate(values.tolist())}
+            if len(index_dict) != len(values):
+                raise ValueError('values of dimension {} are not unique'.format(dimension))
+            self.index_dicts.append(index_dict)
+
+            if np.issubdtype(values.dtype, np.integer) \
+                    and int(values.max()) - int(values.min()) < MAX_LOOKUP_SPARSITY * len(values):
+                offset = int(values.min())
+                lookup = np.full(int(values.max()) - offset + 1, -1, dtype=np.int64)
+                lookup[values - offset] = np.arange(len(values))
+                self.lookups.append((offset, lookup))
+            else:
+                order = np.argsort(values)
+                self.lookups.append((values[order], order))
+
+    def encode(self, state):
+        """
+        :param state: list of state values, one per dimension
+        :return: state index
+        """
+        if len(state) != len(self.dimension_sizes):
+            raise ValueError('state {} needs {} values'.format(state, len(self.dimension_sizes)))
+        state_index = 0
+        for dimension, (value, index_dict, size) in enumerate(zip(state, self.index_dicts, self.dimension_sizes)):
+            value_index = index_dict.get(value)
+            if value_index is None:
+                raise ValueError('value {} of dimension {} is not one of {}'.format(
+                    value, dimension, self.state_dimension_values[dimension].tolist()))
+            state_index = state_index * size + value_index
+        return state_index
+
+    def encode_batch(self, states):
+        """
+        :param states: (N, dimensions) array of states
+        :return: (N,) array of state indices
+        """
+        states = np.asarray(states)
+        if states.ndim != 2 or states.shape[1] != len(self.dimension_sizes):
+            raise ValueError('states must be an (N, {}) array'.format(len(self.dimension_sizes)))
+        state_indices = np.zeros(len(states), dtype=np.int64)
+
+        for dimension, (lookup, size) in enumerate(zip(self.lookups, self.dimension_sizes)):
+            column = states[:, dimension]
+            if isinstance(lookup[0], int):
+                offset, value_lookup = lookup
+                positions = np.rint(column).astype(np.int64) - offset if column.dtype.kind == 'f' \
+                    else column.astype(np.int64) - offset
+                valid = (positions >= 0) & (positions < len(value_lookup)) & (positions + offset == column)
+                value_indices = np.where(valid, value_lookup[np.clip(positions, 0, len(value_lookup) - 1)], -1)
+            else:
+                sorted_values, order = lookup
+                positions = np.clip(np.searchsorted(sorted_values, column), 0, len(sorted_values) - 1)
+                value_indices = np.where(sorted_values[positions] == column, order[positions], -1)
+
+            invalid = np.flatnonzero(value_indices < 0)
+            if len(invalid) > 0:
+                raise ValueError('value {} of dimension {} (state {}) is not one of {}'.format(
+                    column[invalid[0]], dimension, invalid[0], self.state_dimension_values[dimension].tolist()))
+            state_indices = state_indices * size + value_indices
+        return state_indices
+
+    def decode(self, state_index):
+        """
+        :param state_index: state index
+        :return: list of state values
+        """
+        return self.decode_batch(np.array([state_index]))[0].tolist()
+
+    def decode_batch(self, state_indices):
+        """
+        :param state_indices: (N,) array of state indices
+        :return: (N, dimensions) array of states
+        """
+        state_indices = np.asarray(state_indices, dtype=np.int64)
+        if np.any((state_indices < 0) | (state_indices >= self.number_of_states)):
+            raise ValueError('state indices must be between 0 and {}'.format(self.number_of_states - 1))
+        return np.stack([values[(state_indices // stride) % size] for values, stride, size
+                         in zip(self.state_dimension_values, self.strides, self.dimension_sizes)], axis=1)
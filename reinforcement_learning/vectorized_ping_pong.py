@@ -0,0 +1,130 @@
+import time
+
+import numpy as np
+
+from reinforcement_learning.reinforcement_learning_structures import ReinforcementLearningAgent, E_GREEDY, GREEDY
+
+# same state dimensions as BasicGame in ping_pong_new.py: x ball, y ball, x bat, x velocity, y velocity
+STATE_DIMENSION_VALUES = [
+    np.arange(1, 11),
+    np.arange(1, 12),
+    np.arange(0, 10),
+    np.array([-1, 1]),
+    np.array([-1, 1])
+]
+# bat movement of the actions left, stay and right
+BAT_MOVES = np.array([-1, 0, 1])
+X_BALL, Y_BALL, X_BAT, X_VELOCITY, Y_VELOCITY = range(5)
+
+# training parameters (same as ping_pong_new.py)
+NUMBER_OF_GAMES = 64
+EPISODES = 5000
+LEARNING_RATE = 0.01
+DISCOUNT_FACTOR = 0.9
+EPSILON = 0.1
+EVALUATION_EPISODES = 1000
+SEED = 42
+# trained q table, loaded by ping_pong_new.py instead of training
+Q_TABLE_PATH = 'ping_pong_q_table.npy'
+
+
+class VectorizedPingPong:
+    """
+    headless ping pong without OpenGL: N independent games as one (N, 5) state array, every step moves all bats and
+    balls with the dynamics, rewards and termination of BasicGame.action, provides actions and
+    state_dimension_values like a ReinforcementLearningDomain for the ReinforcementLearningAgent
+    like in BasicGame a game is not reset after the ball reached the bottom line, it just bounces back
+    """
+
+    def __init__(self, number_of_games, seed=None):
+        """
+        creates the games
+        :param number_of_games: number of games played in parallel
+        :param seed: seed of the random start states
+        """
+        self.number_of_games = number_of_games
+        self.actions = list(BAT_MOVES)
+        self.state_dimension_values = STATE_DIMENSION_VALUES
+        self.rng = np.random.default_rng(seed)
+        self.states = None
+        self.positive_rewards = 0
+        self.total_rewards = 0
+
+    def reset(self, states=None):
+        """
+        sets the states of all games
+        :param states: (N, 5) array or one state for all games, random states if None
+        :return: copy of the (N, 5) state array
+        """
+        if states is None:
+            self.states = np.stack([self.rng.choice(values, self.number_of_games)
+                                    for values in self.state_dimension_values], axis=1)
+        else:
+            self.states = np.array(np.broadcast_to(states, (self.number_of_games, len(self.state_dimension_values))),
+                                   dtype=np.int64)
+        return self.states.copy()
+
+    def step(self, action_indices):
+        """
+        performs one action in every game
+        :param action_indices: (N,) array of action indices
+        :return: (N,) rewards (1 ball caught, -1 ball missed, 0 otherwise), (N, 5) future states and (N,) boolean
+                 array of the games whose ball reached the bottom line (end of an episode)
+        """
+        states = self.states
+        x_values, y_values, bat_values = self.state_dimension_values[:3]
+        bat = np.clip(states[:, X_BAT] + BAT_MOVES[action_indices], bat_values[0], bat_values[-1])
+        x_ball = states[:, X_BALL] + states[:, X_VELOCITY]
+        y_ball = states[:, Y_BALL] + states[:, Y_VELOCITY]
+
+        # change direction of ball if it's at wall
+        x_velocity = np.where((x_ball > x_values[-1]) | (x_ball < x_values[0]), -states[:, X_VELOCITY],
+                              states[:, X_VELOCITY])
+        y_velocity = np.where((y_ball > y_values[-1]) | (y_ball < y_values[0]), -states[:, Y_VELOCITY],
+                              states[:, Y_VELOCITY])
+
+        # ball on bottom line is caught if the bat is at most two fields left of it
+        terminated = y_ball == 0
+        caught = (x_ball - bat >= 0) & (x_ball - bat <= 2)
+        rewards = np.where(terminated, np.where(caught, 1, -1), 0)
+        self.positive_rewards += np.count_nonzero(terminated & caught)
+        self.total_rewards += np.count_nonzero(terminated)
+
+        self.states = np.stack([np.clip(x_ball, x_values[0], x_values[-1]), np.clip(y_ball, y_values[0], y_values[-1]),
+                                bat, x_velocity, y_velocity], axis=1)
+        return rewards, self.states.copy(), terminated
+
+    def success_rate(self):
+        """
+        :return: share of caught balls of all balls that reached the bottom line
+        """
+        return self.positive_rewards / self.total_rewards if self.total_rewards > 0 else 0.0
+
+
+def evaluate(agent, environment, episodes):
+    """
+    plays with the greedy actions of a trained agent without learning
+    :param agent: trained ReinforcementLearningAgent
+    :param environment: VectorizedPingPong
+    :param episodes: number of balls on the bottom line to play
+    :return: success rate
+    """
+    environment.positive_rewards = environment.total_rewards = 0
+    state_indices = agent.state_encoder.encode_batch(environment.reset())
+    while environment.total_rewards < episodes:
+        rewards, states, terminated = environment.step(agent.greedy_selection(state_indices))
+        state_indices = agent.state_encoder.encode_batch(states)
+    return environment.success_rate()
+
+
+if __name__ == '__main__':
+    np.random.seed(SEED)
+    ping_pong = VectorizedPingPong(NUMBER_OF_GAMES, SEED)
+    agent = ReinforcementLearningAgent(ping_pong, EPISODES, DISCOUNT_FACTOR, LEARNING_RATE, E_GREEDY, EPSILON)
+    start = time.time()
+    steps = agent.learn_batch(ping_pong)
+    print('{} episodes in {} steps of {} games: {:.2f}s'.format(EPISODES, steps, NUMBER_OF_GAMES, time.time() - start))
+    print('{}% success rate while learning'.format(round(ping_pong.success_rate() * 100)))
+    print('{}% success rate of the {} policy'.format(round(evaluate(agent, ping_pong, EVALUATION_EPISODES) * 100),
+                                                     GREEDY))
+    agent.save(Q_TABLE_PATH)
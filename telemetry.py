@@ -0,0 +1,208 @@
+import time
+
+
+class RunStatistics:
+    """
+    counters of one optimization run
+    """
+
+    def __init__(self, name, start_iteration=0):
+        """
+        creates empty statistics
+        :param name: name of the algorithm
+        :param start_iteration: iteration the run starts at (resumed runs)
+        """
+        self.name = name
+        self.start_iteration = start_iteration
+        self.iterations = start_iteration
+        self.accepted = 0
+        self.rejected = 0
+        self.current_fitness = None
+        self.best_fitness = None
+        self.temperature = None
+        self.best_fitness_history = []  # (iteration, seconds, fitness) of each new best fitness
+        self.start_time = time.perf_counter()
+        self.end_time = None
+
+    def elapsed_seconds(self):
+        """
+        :return: seconds since the start (until the end of a finished run)
+        """
+        return (self.end_time or time.perf_counter()) - self.start_time
+
+    def iterations_per_second(self):
+        """
+        :return: iterations per second
+        """
+        seconds = self.elapsed_seconds()
+        return (self.iterations - self.start_iteration) / seconds if seconds > 0 else 0.0
+
+    def acceptance_rate(self):
+        """
+        :return: share of accepted moves
+        """
+        moves = self.accepted + self.rejected
+        return self.accepted / moves if moves > 0 else 0.0
+
+    def as_dict(self):
+        """
+        :return: counters as dictionary
+        """
+        return {
+            'name': self.name,
+            'iterations': self.iterations,
+            'accepted': self.accepted,
+            'rejected': self.rejected,
+            'current_fitness': self.current_fitness,
+            'best_fitness': self.best_fitness,
+            'temperature': self.temperature,
+            'seconds': self.elapsed_seconds(),
+            'iterations_per_second': self.iterations_per_second(),
+            'acceptance_rate': self.acceptance_rate()
+        }
+
+
+class Observer:
+    """
+    base class of progress observers, all callbacks do nothing by default
+    """
+
+    def on_start(self, algorithm, statistics):
+        pass
+
+    def on_improvement(self, algorithm, statistics):
+        pass
+
+    def on_progress(self, algorithm, statistics):
+        pass
+
+    def on_finish(self, algorithm, statistics):
+        pass
+
+
+class PrintObserver(Observer):
+    """
+    prints the progress to stdout
+    """
+
+    def __init__(self, print_improvements=True):
+        """
+        :param print_improvements: print every new best fitness, not only the sampled progress
+        """
+        self.print_improvements = print_improvements
+
+    def on_start(self, algorithm, statistics):
+        print('-' * 30 + statistics.name + '-' * 30)
+        print('Starting fitness:', statistics.best_fitness)
+        print('-' * 40)
+
+    def on_improvement(self, algorithm, statistics):
+        if self.print_improvements:
+            if statistics.temperature is None:
+                print('New fitness:', statistics.best_fitness)
+            else:
+                print('New fitness:', statistics.best_fitness, '( temp:', statistics.temperature, ')')
+
+    def on_progress(self, algorithm, statistics):
+        progress = 'Iteration {}: fitness {}, best fitness {}, {:.0f} iterations/s'.format(
+            statistics.iterations, statistics.current_fitness, statistics.best_fitness,
+            statistics.iterations_per_second())
+        if statistics.accepted + statistics.rejected > 0:
+            progress += ', acceptance rate {:.3f}'.format(statistics.acceptance_rate())
+        print(progress)
+
+    def on_finish(self, algorithm, statistics):
+        print('Finished after {} iterations in {:.2f}s, best fitness {}'.format(
+            statistics.iterations, statistics.elapsed_seconds(), statistics.best_fitness))
+
+
+class HistoryObserver(Observer):
+    """
+    records every sampled progress as dictionary
+    """
+
+    def __init__(self):
+        self.samples = []
+
+    def on_progress(self, algorithm, statistics):
+        self.samples.append(statistics.as_dict())
+
+    def on_finish(self, algorithm, statistics):
+        self.samples.append(statistics.as_dict())
+
+
+class Telemetry:
+    """
+    collects the statistics of the runs of an algorithm and notifies its observers, without observers only the
+    counters are updated, the hot loops report their counters every sample_interval iterations
+    """
+
+    def __init__(self, observers=None, sample_interval=1000):
+        """
+        :param observers: list of observers, none means silent
+        :param sample_interval: iterations between two progress samples
+        """
+        self.observers = list(observers or [])
+        self.sample_interval = sample_interval
+        self.algorithm = None
+        self.statistics = None
+
+    def start(self, algorithm, name, fitness, temperature=None, start_iteration=0):
+        """
+        starts the statistics of a new run
+        :param algorithm: running algorithm, passed to the observers
+        :param name: name of the run
+        :param fitness: starting fitness
+        :param temperature: starting temperature (only annealing)
+        :param start_iteration: iteration the run starts at (resumed runs)
+        :return: statistics of the run
+        """
+        self.algorithm = algorithm
+        self.statistics = RunStatistics(name, start_iteration)
+        self.statistics.current_fitness = fitness
+        self.statistics.best_fitness = fitness
+        self.statistics.temperature = temperature
+        self.statistics.best_fitness_history.append((start_iteration, 0.0, fitness))
+        for observer in self.observers:
+            observer.on_start(algorithm, self.statistics)
+        return self.statistics
+
+    def improvement(self, iteration, fitness, temperature=None):
+        """
+        records a new best fitness
+        """
+        statistics = self.statistics
+        statistics.best_fitness = fitness
+        statistics.best_fitness_history.append((iteration, time.perf_counter() - statistics.start_time, fitness))
+        if self.observers:
+            statistics.iterations = iteration
+            statistics.temperature = temperature
+            for observer in self.observers:
+                observer.on_improvement(self.algorithm, statistics)
+
+    def sample(self, iteration, accepted, rejected, fitness, temperature=None):
+        """
+        updates the counters and notifies the observers about the progress
+        """
+        self.update(iteration, accepted, rejected, fitness, temperature)
+        for observer in self.observers:
+            observer.on_progress(self.algorithm, self.statistics)
+
+    def finish(self, iteration, accepted, rejected, fitness, temperature=None):
+        """
+        updates the counters, ends the run and notifies the observers
+        :return: statistics of the run
+        """
+        self.update(iteration, accepted, rejected, fitness, temperature)
+        self.statistics.end_time = time.perf_counter()
+        for observer in self.observers:
+            observer.on_finish(self.algorithm, self.statistics)
+        return self.statistics
+
+    def update(self, iteration, accepted, rejected, fitness, temperature):
+        statistics = self.statistics
+        statistics.iterations = iteration
+        statistics.accepted = accepted
+        statistics.rejected = rejected
+        statistics.current_fitness = fitness
+        statistics.temperature = temperature
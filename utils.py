@@ -1,4 +1,122 @@
+import bisect
+import os
+import platform
 import random
+import tempfile
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+# sampling methods of DiscreteSampler
+CUMULATIVE_SUM = 'cumulative_sum'
+ALIAS = 'alias'
+
+
+class DiscreteSampler:
+    """
+    draws indices with probabilities proportional to fixed weights (roulette wheel), built once per distribution:
+    cumulative sum with binary search (O(n) build, O(log n) per draw) or the alias method (O(n) build, O(1) per draw)
+    """
+
+    def __init__(self, weights, method=CUMULATIVE_SUM, rng=None):
+        """
+        creates a sampler
+        :param weights: non negative weights (f.e. fitness values or probabilities), do not need to sum up to 1
+        :param method: 'cumulative_sum' or 'alias'
+        :param rng: numpy random generator for sample_batch, the np.random module by default
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        if weights.ndim != 1 or len(weights) == 0:
+            raise ValueError('weights must be a non empty list')
+        if np.any(weights < 0) or not np.all(np.isfinite(weights)):
+            raise ValueError('weights must be finite and non negative')
+        self.total = float(weights.sum())
+        if self.total <= 0:
+            raise ValueError('sum of weights must be positive')
+        self.size = len(weights)
+        self.method = method
+        self.rng = rng if rng is not None else np.random
+
+        if method == CUMULATIVE_SUM:
+            self.cumulative = np.cumsum(weights)
+            self.total = float(self.cumulative[-1])
+            # python list for the single draws, bisect on it is faster than numpy for scalars
+            self.cumulative_list = self.cumulative.tolist()
+        elif method == ALIAS:
+            self.probabilities, self.aliases = self.build_alias_tables(weights)
+            self.probability_list = self.probabilities.tolist()
+            self.alias_list = self.aliases.tolist()
+        else:
+            raise ValueError('method must be cumulative_sum or alias')
+
+    def build_alias_tables(self, weights):
+        """
+        builds the tables of the alias method (vose): each column i is chosen uniformly and keeps i with
+        probabilities[i], otherwise it returns aliases[i]
+        :param weights: weights
+        :return: probability and alias array
+        """
+        scaled = weights * (self.size / self.total)
+        probabilities = np.ones(self.size)
+        aliases = np.arange(self.size)
+        small = [i for i in range(self.size) if scaled[i] < 1]
+        large = [i for i in range(self.size) if scaled[i] >= 1]
+
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            probabilities[less] = scaled[less]
+            aliases[less] = more
+            scaled[more] -= 1 - scaled[less]
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+        # the rest is 1 up to rounding errors
+
+        return probabilities, aliases
+
+    def sample(self):
+        """
+        draws one index with the random module
+        :return: index
+        """
+        if self.method == CUMULATIVE_SUM:
+            return min(bisect.bisect_right(self.cumulative_list, random.random() * self.total), self.size - 1)
+        column = int(random.random() * self.size)
+        return column if random.random() < self.probability_list[column] else self.alias_list[column]
+
+    def sample_batch(self, size, rng=None):
+        """
+        draws many indices with one numpy call
+        :param size: number of indices
+        :param rng: numpy random generator for this batch, the one of the sampler by default
+        :return: numpy array of indices
+        """
+        rng = rng if rng is not None else self.rng
+        if self.method == CUMULATIVE_SUM:
+            indices = np.searchsorted(self.cumulative, rng.random(size) * self.total, side='right')
+            return np.minimum(indices, self.size - 1)
+        columns = (rng.random(size) * self.size).astype(np.int64)
+        return np.where(rng.random(size) < self.probabilities[columns], columns, self.aliases[columns])
+
+
+def get_pyplot(headless=False):
+    """
+    imports matplotlib.pyplot only when a plot is requested, so modules with plots start fast and work without
+    matplotlib as long as nothing is plotted
+    :param headless: use the non interactive Agg backend, plots can only be saved to files (servers without display)
+    :return: matplotlib.pyplot module
+    """
+    import matplotlib
+    if headless:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
 
 
 def get_random_index_with_probabilities(probabilities):
@@ -7,16 +125,36 @@ def get_random_index_with_probabilities(probabilities):
     :param probabilities: list of probabilities
     :return: index
     """
-    selection_probability = random.random()
-    probability_sum = 0
-    index = random.randint(0, len(probabilities) - 1)
-    population_fitness_sum = sum([probabilities[a] for a in range(len(probabilities))])
+    return DiscreteSampler(probabilities).sample()
 
-    while True:  # do while loop
-        index += 1
-        index = index % len(probabilities)
-        probability_sum += (probabilities[index] / population_fitness_sum)
-        if selection_probability < probability_sum:  # do while loop
-            break
 
-    return index
\ No newline at end of file
+def write_atomically(path, write):
+    """
+    writes a file to a temporary file next to it and moves it to the path afterwards, so a crash while writing leaves
+    the previous file intact
+    :param path: path of the file
+    :param write: function that writes the content to a binary file object
+    """
+    # write next to the target so that os.replace stays on one file system
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
+def peak_memory_mb():
+    """
+    returns the peak resident memory of the process in MB or None if it can not be measured
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macOS
+    return peak / (1024 * 1024) if platform.system() == 'Darwin' else peak / 1024
@@ -1,7 +1,7 @@
 from collections import Counter
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.colors import ListedColormap
+
+from utils import get_pyplot
 
 
 class KNearestNeighbourClassifier:
@@ -72,34 +72,47 @@ class KNearestNeighbourClassifier:
         return sum([1 if prediction == y_test[idx] else 0
                     for idx, prediction in enumerate([self.predict(x) for x in X_test])]) / X_test.shape[0]
 
-    def plot(self, mesh_grid_size, accuracy_score=None):
+    def decision_grid(self, mesh_grid_size):
         """
-        plot the test data
-        :param mesh_grid_size:
-        :param accuracy_score:
-        :return:
+        predicts the labels of a mesh over the range of the training data
+        :param mesh_grid_size: distance between two mesh points
+        :return: x coordinates, y coordinates and predicted labels of the mesh as 2d arrays of equal shape
         """
         X = self.X
-        y = self.y
 
         if X.shape[1] != 2:
             raise Exception('Only problems with two dimensions can be plotted')
 
-        # Create color maps
-        cmap_light = ListedColormap(['#FFAAAA', '#AAFFAA', '#AAAAFF'])
-        cmap_bold = ListedColormap(['#FFAAAA', '#AAFFAA', '#AAAAFF'])
-
-        # Plot the decision boundary. For that, we will assign a color to each
-        # point in the mesh [x_min, x_max]x[y_min, y_max].
+        # assign a label to each point in the mesh [x_min, x_max]x[y_min, y_max]
         x_min, x_max = X[:, 0].min(), X[:, 0].max()
         y_min, y_max = X[:, 1].min(), X[:, 1].max()
         xx, yy = np.meshgrid(np.arange(x_min, x_max, mesh_grid_size),
                              np.arange(y_min, y_max, mesh_grid_size))
         ravel = np.c_[xx.ravel(), yy.ravel()]
         Z = np.array([self.predict(mesh_vector.tolist()) for mesh_vector in ravel])
+        return xx, yy, Z.reshape(xx.shape)
+
+    def plot(self, mesh_grid_size, accuracy_score=None, headless=False, plot_path='knn_spiral.png'):
+        """
+        plot the test data, matplotlib is only imported here
+        :param mesh_grid_size:
+        :param accuracy_score:
+        :param headless: save the plot without showing it (non interactive backend)
+        :param plot_path: file to save the plot to, None to not save it
+        :return:
+        """
+        X = self.X
+        y = self.y
+        xx, yy, Z = self.decision_grid(mesh_grid_size)
+        plt = get_pyplot(headless)
+        from matplotlib.colors import ListedColormap
+
+        # Create color maps
+        cmap_light = ListedColormap(['#FFAAAA', '#AAFFAA', '#AAAAFF'])
+        cmap_bold = ListedColormap(['#FFAAAA', '#AAFFAA', '#AAAAFF'])
+
         # Put the result into a color plot
-        Z = Z.reshape(xx.shape)
-        plt.figure()
+        figure = plt.figure()
         plt.pcolormesh(xx, yy, Z, cmap=cmap_light)
 
         # Plot also the training points
@@ -109,6 +122,10 @@ class KNearestNeighbourClassifier:
         plt.ylim(yy.min(), yy.max())
         title = 'knn spiral classification (k = {}, records = {} ' + \
                 ('accuracy = {}% ' if accuracy_score is not None else '') + ')'
-        plt.title(title.format(self.k, ravel.shape[0] + X.shape[0], accuracy_score))
-        plt.savefig("knn_spiral.png")
-        plt.show()
+        plt.title(title.format(self.k, Z.size + X.shape[0], accuracy_score))
+        if plot_path is not None:
+            plt.savefig(plot_path)
+        if headless:
+            plt.close(figure)
+        else:
+            plt.show()
@@ -6,6 +6,7 @@ from vector_quantization.knn.k_nearest_neighbour import KNearestNeighbourClassif
 K = 3
 MESH_GRID_SIZE = .1
 TEST_SIZE = .05
+HEADLESS = False  # True saves the plot to knn_spiral.png without showing it
 
 # Data parameters
 input_data = '..\\spiral.csv'
@@ -25,4 +26,4 @@ if __name__ == '__main__':
     X, y = load_data()
     knn_classifier = KNearestNeighbourClassifier(K)
     knn_classifier.fit(X, y)
-    knn_classifier.plot(MESH_GRID_SIZE,  '-')
+    knn_classifier.plot(MESH_GRID_SIZE,  '-', HEADLESS)